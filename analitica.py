@@ -0,0 +1,87 @@
+# Reportes del inventario calculados por columnas con NumPy:
+# valoración (cantidad * precio), stock bajo, distribución de precios y más vendidos.
+from collections import namedtuple
+import numpy as np
+from sqlalchemy import select
+from modelos import db, Producto
+
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+TAMANO_BLOQUE = 50000
+
+Columnas = namedtuple('Columnas', 'ids cantidad precio')
+
+
+def columnas_desde_inventario(inventario) -> Columnas:
+    """Arma las columnas desde el cache en memoria (sin ir a la BD)."""
+    inventario.sincronizar()
+    productos = list(inventario.productos.values())
+    n = len(productos)
+    return Columnas(
+        np.fromiter((p.id for p in productos), dtype=np.int64, count=n),
+        np.fromiter((p.cantidad for p in productos), dtype=np.int64, count=n),
+        np.fromiter((p.precio for p in productos), dtype=np.float64, count=n),
+    )
+
+
+def columnas_desde_bd(tamano_bloque=TAMANO_BLOQUE) -> Columnas:
+    """Lee la tabla por bloques; cada bloque se convierte a arrays y se concatenan al final."""
+    ids, cantidades, precios = [], [], []
+    resultado = db.session.execute(
+        select(Producto.id, Producto.cantidad, Producto.precio).execution_options(yield_per=tamano_bloque)
+    )
+    for bloque in resultado.partitions():
+        n = len(bloque)
+        ids.append(np.fromiter((f[0] for f in bloque), dtype=np.int64, count=n))
+        cantidades.append(np.fromiter((f[1] for f in bloque), dtype=np.int64, count=n))
+        precios.append(np.fromiter((f[2] for f in bloque), dtype=np.float64, count=n))
+    if not ids:
+        return Columnas(np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float64))
+    return Columnas(np.concatenate(ids), np.concatenate(cantidades), np.concatenate(precios))
+
+
+def valoracion(col: Columnas, bordes):
+    """Valor total del stock y valor por rango de precio.
+    bordes=(10, 50) da los rangos [0, 10), [10, 50) y [50, ∞)."""
+    valor = col.cantidad * col.precio
+    rango = np.digitize(col.precio, bordes)
+    por_rango = np.bincount(rango, weights=valor, minlength=len(bordes) + 1)
+    productos = np.bincount(rango, minlength=len(bordes) + 1)
+    unidades = np.bincount(rango, weights=col.cantidad, minlength=len(bordes) + 1)
+    limites = (0, *bordes, None)
+    rangos = [
+        {'desde': limites[i], 'hasta': limites[i + 1], 'productos': int(productos[i]),
+         'unidades': int(unidades[i]), 'valor': float(por_rango[i])}
+        for i in range(len(bordes) + 1)
+    ]
+    return float(valor.sum()), rangos
+
+
+def stock_bajo(col: Columnas, umbral, limite=100):
+    """Ids con cantidad <= umbral, de menor a mayor cantidad (a lo sumo 'limite')."""
+    idx = np.flatnonzero(col.cantidad <= umbral)
+    if len(idx) > limite:
+        idx = idx[np.argpartition(col.cantidad[idx], limite - 1)[:limite]]
+    idx = idx[np.lexsort((col.ids[idx], col.cantidad[idx]))]
+    return col.ids[idx].tolist(), int(np.count_nonzero(col.cantidad <= umbral))
+
+
+def percentiles_precio(col: Columnas, percentiles=PERCENTILES):
+    if not len(col.precio):
+        return {}
+    valores = np.percentile(col.precio, percentiles)
+    return {p: float(v) for p, v in zip(percentiles, valores)}
+
+
+def reporte(col: Columnas, bordes, umbral, limite_stock=100):
+    total, rangos = valoracion(col, bordes)
+    bajos, total_bajos = stock_bajo(col, umbral, limite_stock)
+    return {
+        'productos': int(len(col.ids)),
+        'unidades': int(col.cantidad.sum()),
+        'valor_total': total,
+        'rangos': rangos,
+        'stock_bajo': bajos,
+        'total_stock_bajo': total_bajos,
+        'percentiles': percentiles_precio(col),
+        'precio_medio': float(col.precio.mean()) if len(col.precio) else 0.0,
+    }
@@ -0,0 +1,235 @@
+# API JSON v1: listados paginados y operaciones en lote para productos y clientes.
+# Cada escritura en lote es una sola transacción: si un elemento falla no se guarda ninguno.
+import json
+from flask import Blueprint, Response, current_app, request
+from sqlalchemy.exc import IntegrityError
+from modelos import db, Cliente
+from formularios import validar_producto, validar_cliente
+from repositorio import pagina_clientes
+
+try:
+    import orjson  # en requirements.txt; sin él se usa json, varias veces más lento
+except ImportError:
+    orjson = None
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+CAMPOS_PRODUCTO = ('id', 'nombre', 'cantidad', 'precio')
+CAMPOS_CLIENTE = ('id', 'nombre', 'direccion', 'correo_electronico')
+MAX_LOTE = 1000
+MAX_LIMIT = 1000
+
+
+def respuesta_json(datos, status=200):
+    if orjson is not None:
+        cuerpo = orjson.dumps(datos)
+    else:
+        cuerpo = json.dumps(datos, ensure_ascii=False, separators=(',', ':'))
+    return Response(cuerpo, status=status, mimetype='application/json')
+
+
+def error(mensaje, status=400, **extra):
+    return respuesta_json({'error': mensaje, **extra}, status)
+
+
+def _inventario():
+    return current_app.extensions['inventario']
+
+
+def _campos(disponibles):
+    pedidos = request.args.get('fields')
+    if not pedidos:
+        return disponibles
+    campos = tuple(c for c in pedidos.split(',') if c in disponibles)
+    return campos or disponibles
+
+
+def _ids():
+    try:
+        return [int(i) for i in request.args['ids'].split(',') if i]
+    except ValueError:
+        return None
+
+
+def _es_id(valor):
+    # bool es subclase de int: {"id": true} no es el id 1
+    return type(valor) is int
+
+
+def _limit():
+    return max(1, min(request.args.get('limit', 100, type=int), MAX_LIMIT))
+
+
+def _lote():
+    # cuerpo: lista de objetos (o {"ids": [...]} para borrar)
+    datos = request.get_json(silent=True)
+    if isinstance(datos, dict) and 'ids' in datos:
+        datos = datos['ids']
+    if not isinstance(datos, list) or not datos:
+        return None, error('Se esperaba una lista JSON no vacía.')
+    if len(datos) > MAX_LOTE:
+        return None, error(f'Máximo {MAX_LOTE} elementos por lote.', 413)
+    return datos, None
+
+
+def _validar_lote(datos, validar, parcial):
+    limpios, errores = [], []
+    for i, d in enumerate(datos):
+        if not isinstance(d, dict):
+            errores.append({'indice': i, 'error': 'Se esperaba un objeto.'})
+            continue
+        limpio, err = validar(d, parcial=parcial)
+        if parcial:
+            if not _es_id(d.get('id')):
+                err = err or 'Falta el id.'
+            elif limpio is not None:
+                limpio = {**limpio, 'id': d['id']}
+        if err:
+            errores.append({'indice': i, 'error': err})
+        else:
+            limpios.append(limpio)
+    return limpios, errores
+
+
+# --- Productos (servidos desde el Inventario en memoria) ---
+
+@api.get('/productos')
+def listar_productos():
+    inventario = _inventario()
+    campos = _campos(CAMPOS_PRODUCTO)
+    if 'ids' in request.args:
+        ids = _ids()
+        if ids is None:
+            return error('ids inválidos.')
+        productos = [p for p in map(inventario.obtener, ids) if p is not None]
+        siguiente = None
+    else:
+        limit = _limit()
+        q = request.args.get('q', '').strip()
+        offset = max(0, request.args.get('offset', 0, type=int))
+        despues = request.args.get('despues') or None
+        if q:
+            productos = inventario.buscar_por_nombre(q, limit=limit, offset=offset, despues=despues)
+        else:
+            productos = inventario.listar_todos(limit=limit, offset=offset, despues=despues)
+        siguiente = productos[-1].nombre.lower() if len(productos) == limit else None
+    return respuesta_json({
+        'productos': [{c: getattr(p, c) for c in campos} for p in productos],
+        'siguiente': siguiente,
+        'version': inventario.version,
+    })
+
+
+@api.post('/productos')
+def crear_productos():
+    datos, err = _lote()
+    if err:
+        return err
+    limpios, errores = _validar_lote(datos, validar_producto, parcial=False)
+    if errores:
+        return error('Datos inválidos.', 422, errores=errores)
+    try:
+        productos = _inventario().agregar_varios(limpios)
+    except (ValueError, IntegrityError) as e:
+        return error(str(e), 409)
+    return respuesta_json({'productos': [dict(zip(CAMPOS_PRODUCTO, p.to_tuple())) for p in productos]}, 201)
+
+
+@api.patch('/productos')
+def actualizar_productos():
+    datos, err = _lote()
+    if err:
+        return err
+    limpios, errores = _validar_lote(datos, validar_producto, parcial=True)
+    if errores:
+        return error('Datos inválidos.', 422, errores=errores)
+    try:
+        productos = _inventario().actualizar_varios(limpios)
+    except LookupError as e:
+        return error(str(e), 404)
+    except (ValueError, IntegrityError) as e:
+        return error(str(e), 409)
+    return respuesta_json({'productos': [dict(zip(CAMPOS_PRODUCTO, p.to_tuple())) for p in productos]})
+
+
+@api.delete('/productos')
+def eliminar_productos():
+    ids, err = _lote()
+    if err:
+        return err
+    if not all(_es_id(i) for i in ids):
+        return error('ids inválidos.')
+    return respuesta_json({'eliminados': _inventario().eliminar_varios(ids)})
+
+
+# --- Clientes ---
+
+@api.get('/clientes')
+def listar_clientes():
+    campos = _campos(CAMPOS_CLIENTE)
+    siguiente = None
+    if 'ids' in request.args:
+        ids = _ids()
+        if ids is None:
+            return error('ids inválidos.')
+        filas = db.session.query(*(getattr(Cliente, c) for c in campos)).filter(Cliente.id.in_(ids)).all()
+    else:
+        # paginación por clave (nombre, id), igual que /clientes
+        filas, siguiente = pagina_clientes(_limit(), despues=request.args.get('despues'),
+                                           despues_id=request.args.get('despues_id', type=int), campos=campos)
+    return respuesta_json({'clientes': [dict(zip(campos, f)) for f in filas], 'siguiente': siguiente})
+
+
+@api.post('/clientes')
+def crear_clientes():
+    datos, err = _lote()
+    if err:
+        return err
+    limpios, errores = _validar_lote(datos, validar_cliente, parcial=False)
+    if errores:
+        return error('Datos inválidos.', 422, errores=errores)
+    clientes = [Cliente(**d) for d in limpios]
+    db.session.add_all(clientes)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return error('Algún correo electrónico ya existe.', 409)
+    return respuesta_json({'clientes': [dict(zip(CAMPOS_CLIENTE, c.to_tuple())) for c in clientes]}, 201)
+
+
+@api.patch('/clientes')
+def actualizar_clientes():
+    datos, err = _lote()
+    if err:
+        return err
+    limpios, errores = _validar_lote(datos, validar_cliente, parcial=True)
+    if errores:
+        return error('Datos inválidos.', 422, errores=errores)
+    clientes = {c.id: c for c in Cliente.query.filter(Cliente.id.in_([d['id'] for d in limpios]))}
+    faltan = [d['id'] for d in limpios if d['id'] not in clientes]
+    if faltan:
+        return error('Clientes inexistentes.', 404, ids=faltan)
+    for d in limpios:
+        for campo, valor in d.items():
+            if campo != 'id':
+                setattr(clientes[d['id']], campo, valor)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return error('Algún correo electrónico ya existe.', 409)
+    return respuesta_json({'clientes': [dict(zip(CAMPOS_CLIENTE, clientes[d['id']].to_tuple()))
+                                        for d in limpios]})
+
+
+@api.delete('/clientes')
+def eliminar_clientes():
+    ids, err = _lote()
+    if err:
+        return err
+    if not all(_es_id(i) for i in ids):
+        return error('ids inválidos.')
+    eliminados = Cliente.query.filter(Cliente.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+    return respuesta_json({'eliminados': eliminados})
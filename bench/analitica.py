@@ -0,0 +1,84 @@
+# Reporte del inventario con columnas NumPy (analitica.reporte) contra el mismo cálculo
+# con bucles de Python sobre una lista de productos, como se hacía antes.
+# Los datos son sintéticos (no hace falta BD); se comprueba que ambos den lo mismo.
+#
+#   python bench/analitica.py --productos 1000000
+import bisect
+import argparse
+import numpy as np
+from comun import cronometro, tabla
+import analitica
+
+BORDES = (10, 50, 100, 500)
+UMBRAL = 5
+
+
+def reporte_python(filas, bordes, umbral, limite=100):
+    total, unidades = 0.0, 0
+    rangos = [{'productos': 0, 'unidades': 0, 'valor': 0.0} for _ in range(len(bordes) + 1)]
+    bajos = []
+    for pid, cantidad, precio in filas:
+        valor = cantidad * precio
+        total += valor
+        unidades += cantidad
+        r = rangos[bisect.bisect_right(bordes, precio)]
+        r['productos'] += 1
+        r['unidades'] += cantidad
+        r['valor'] += valor
+        if cantidad <= umbral:
+            bajos.append((cantidad, pid))
+    bajos.sort()
+    precios = sorted(f[2] for f in filas)
+    percentiles = {}
+    for p in analitica.PERCENTILES:
+        # interpolación lineal, igual que np.percentile
+        k = (len(precios) - 1) * p / 100
+        i = int(k)
+        j = min(i + 1, len(precios) - 1)
+        percentiles[p] = precios[i] + (precios[j] - precios[i]) * (k - i)
+    return {'valor_total': total, 'unidades': unidades, 'rangos': rangos,
+            'stock_bajo': [pid for _, pid in bajos[:limite]], 'total_stock_bajo': len(bajos),
+            'percentiles': percentiles}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=1000000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    azar = np.random.default_rng(0)
+    col = analitica.Columnas(
+        np.arange(1, args.productos + 1, dtype=np.int64),
+        azar.integers(0, 200, args.productos, dtype=np.int64),
+        np.round(azar.uniform(1, 1000, args.productos), 2),
+    )
+    filas = list(zip(col.ids.tolist(), col.cantidad.tolist(), col.precio.tolist()))
+
+    tiempos = {'numpy': [], 'python': []}
+    for _ in range(args.repeticiones):
+        t = {}
+        with cronometro(t, 'numpy'):
+            r_np = analitica.reporte(col, BORDES, UMBRAL)
+        with cronometro(t, 'python'):
+            r_py = reporte_python(filas, BORDES, UMBRAL)
+        for k in tiempos:
+            tiempos[k].append(t[k])
+
+    # entre productos con la misma cantidad, argpartition puede elegir otros ids
+    assert [filas[i - 1][1] for i in r_np['stock_bajo']] == [filas[i - 1][1] for i in r_py['stock_bajo']]
+    assert r_np['total_stock_bajo'] == r_py['total_stock_bajo']
+    assert r_np['unidades'] == r_py['unidades']
+    assert np.isclose(r_np['valor_total'], r_py['valor_total'])
+    assert all(np.isclose(r_np['percentiles'][p], v) for p, v in r_py['percentiles'].items())
+
+    mejor_np = min(tiempos['numpy'])
+    print(f'{args.productos} productos, mejor de {args.repeticiones}')
+    tabla([{'calculo': 'analitica.reporte (NumPy)', 'segundos': mejor_np, 'veces': 1.0},
+           {'calculo': 'bucles de Python', 'segundos': min(tiempos['python']),
+            'veces': min(tiempos['python']) / mejor_np}],
+          ['calculo', 'segundos', 'veces'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# Arranque de workers: tiempo hasta la primera respuesta, hasta tener el catálogo
+# cargado, y memoria por worker (RSS y PSS; PSS reparte las páginas compartidas por
+# copy-on-write) según INVENTARIO_CARGA y GUNICORN_PRELOAD.
+#
+#   python bench/arranque.py --productos 200000 --workers 2
+#
+# Solo Linux (lee /proc). Usa gunicorn con gunicorn.conf.py, como en producción.
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+import urllib.request
+import urllib.error
+from comun import RAIZ, entorno_temporal, poblar_productos, tabla
+
+ESCENARIOS = (
+    ('perezosa', '0'),  # por defecto: el catálogo se carga en segundo plano
+    ('inicio', '0'),    # cada worker lo carga al importar la app
+    ('inicio', '1'),    # se carga una vez en el master y los workers lo heredan
+)
+
+
+def esperar(url, limite=120):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            with urllib.request.urlopen(url, timeout=limite) as r:
+                if r.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def hijos(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+
+def memoria_kb(pid):
+    valores = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for linea in f:
+            campo, _, resto = linea.partition(':')
+            if campo in ('Rss', 'Pss'):
+                valores[campo] = int(resto.split()[0])
+    return valores
+
+
+def medir(carga, preload, workers, puerto):
+    env = dict(os.environ, INVENTARIO_CARGA=carga, GUNICORN_PRELOAD=preload,
+               GUNICORN_WORKERS=str(workers), GUNICORN_BIND=f'127.0.0.1:{puerto}')
+    base = f'http://127.0.0.1:{puerto}'
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:app'], cwd=RAIZ, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        esperar(base + '/usuario/bench')  # no toca la BD ni el catálogo
+        primera = time.perf_counter() - inicio
+        esperar(base + '/api/v1/productos?limit=1')  # espera a que el catálogo esté cargado
+        catalogo = time.perf_counter() - inicio
+        # que todos los workers hayan terminado de arrancar y de cargar
+        time.sleep(1)
+        for _ in range(workers * 4):
+            esperar(base + '/api/v1/productos?limit=1')
+        memorias = [memoria_kb(p) for p in hijos(proceso.pid)]
+    finally:
+        proceso.send_signal(signal.SIGTERM)
+        proceso.wait(30)
+    return {
+        'carga': carga, 'preload': preload,
+        'primera_resp_s': primera, 'catalogo_s': catalogo,
+        'rss_mb': sum(m['Rss'] for m in memorias) / len(memorias) / 1024,
+        'pss_mb': sum(m['Pss'] for m in memorias) / len(memorias) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=200000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--puerto', type=int, default=8765)
+    args = parser.parse_args()
+
+    entorno_temporal()
+    poblar_productos(args.productos)
+    print(f'{args.productos} productos, {args.workers} workers (promedio por worker)')
+    tabla([medir(carga, preload, args.workers, args.puerto) for carga, preload in ESCENARIOS],
+          ['carga', 'preload', 'primera_resp_s', 'catalogo_s', 'rss_mb', 'pss_mb'])
+
+
+if __name__ == '__main__':
+    main()
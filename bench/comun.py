@@ -0,0 +1,212 @@
+# Utilidades de los benchmarks: BD SQLite temporal con un catálogo sintético, gunicorn
+# en un puerto local y un generador de carga HTTP con asyncio (muchos clientes
+# concurrentes en un solo proceso, sin dependencias externas).
+# La app lee su configuración del entorno al importarse, así que entorno_temporal()
+# se llama antes de importar app o cualquier módulo que la importe.
+import os
+import sys
+import time
+import shutil
+import atexit
+import signal
+import asyncio
+import tempfile
+import subprocess
+import http.client
+import urllib.parse
+from collections import Counter
+from contextlib import contextmanager
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def entorno_temporal(**extra):
+    """Carpeta temporal con la BD de la app; devuelve la ruta. Se borra al salir."""
+    carpeta = tempfile.mkdtemp(prefix='bench-inventario-')
+    atexit.register(shutil.rmtree, carpeta, ignore_errors=True)
+    os.environ.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(carpeta, 'inventario.db'),
+        'INVENTARIO_SNAPSHOT': '',
+        'TRABAJOS_HILOS': '0',
+        'PASSWORD_PROCESOS': '0',
+        **{k: str(v) for k, v in extra.items()},
+    })
+    return carpeta
+
+
+def fila_producto(i):
+    return {'nombre': f'Producto {i:07d}', 'cantidad': i % 100, 'precio': round(1 + (i % 5000) / 10, 2)}
+
+
+def poblar_productos(n, lote=20000):
+    """Crea las tablas e inserta n productos sintéticos."""
+    from sqlalchemy import insert
+    from app import app, crear_tablas
+    from modelos import db, Producto
+    with app.app_context():
+        crear_tablas()
+        for i in range(0, n, lote):
+            db.session.execute(insert(Producto), [fila_producto(j) for j in range(i, min(n, i + lote))])
+        db.session.commit()
+
+
+@contextmanager
+def cronometro(resultados, nombre):
+    inicio = time.perf_counter()
+    yield
+    resultados[nombre] = time.perf_counter() - inicio
+
+
+def tabla(filas, columnas):
+    """Imprime una lista de dicts como tabla de texto."""
+    anchos = [max(len(c), *(len(_formato(f.get(c))) for f in filas)) for c in columnas]
+    print('  '.join(c.ljust(a) for c, a in zip(columnas, anchos)))
+    for f in filas:
+        print('  '.join(_formato(f.get(c)).ljust(a) for c, a in zip(columnas, anchos)))
+
+
+def _formato(valor):
+    if isinstance(valor, float):
+        return f'{valor:.4f}' if valor < 10 else f'{valor:.1f}'
+    return '' if valor is None else str(valor)
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+# --- Servidor y carga HTTP ---
+
+@contextmanager
+def servidor(puerto, **entorno):
+    """gunicorn con gunicorn.conf.py en 127.0.0.1:puerto; devuelve la URL base."""
+    env = dict(os.environ, GUNICORN_BIND=f'127.0.0.1:{puerto}', **{k: str(v) for k, v in entorno.items()})
+    proceso = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:app'], cwd=RAIZ, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        fin = time.monotonic() + 120
+        while True:
+            try:
+                if pedir('127.0.0.1', puerto, 'GET', '/usuario/bench')[0] == 200:
+                    break
+            except OSError:
+                if proceso.poll() is not None or time.monotonic() > fin:
+                    raise RuntimeError(f'gunicorn no arrancó ({entorno})')
+                time.sleep(0.05)
+        time.sleep(1)  # que terminen de arrancar todos los workers
+        yield f'http://127.0.0.1:{puerto}'
+    finally:
+        proceso.send_signal(signal.SIGTERM)
+        proceso.wait(30)
+
+
+def pedir(host, puerto, metodo, ruta, formulario=None, cabeceras=None):
+    """Una petición sin seguir redirecciones; devuelve (estado, cabeceras)."""
+    conexion = http.client.HTTPConnection(host, puerto, timeout=30)
+    cuerpo = urllib.parse.urlencode(formulario) if formulario else None
+    cabeceras = dict(cabeceras or {})
+    if cuerpo:
+        cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+    try:
+        conexion.request(metodo, ruta, cuerpo, cabeceras)
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        return respuesta.status, respuesta.headers
+    finally:
+        conexion.close()
+
+
+def iniciar_sesion(puerto, email, password):
+    """Cookie de sesión de Flask-Login para usar en las peticiones de carga."""
+    estado, cabeceras = pedir('127.0.0.1', puerto, 'POST', '/login', {'email': email, 'password': password})
+    if estado != 302:
+        raise RuntimeError(f'No se pudo iniciar sesión ({estado})')
+    return cabeceras['Set-Cookie'].split(';', 1)[0]
+
+
+def formulario(datos):
+    return urllib.parse.urlencode(datos).encode(), {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+async def _peticion(lector, escritor, metodo, ruta, cuerpo, cabeceras):
+    cuerpo = cuerpo or b''
+    extra = ''.join(f'{k}: {v}\r\n' for k, v in cabeceras.items())
+    escritor.write(f'{metodo} {ruta} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(cuerpo)}\r\n{extra}\r\n'
+                   .encode() + cuerpo)
+    await escritor.drain()
+    estado = int((await lector.readline()).split()[1])
+    largo, cerrar, por_partes = 0, False, False
+    while (linea := await lector.readline()) not in (b'\r\n', b''):
+        nombre, _, valor = linea.decode('latin-1').partition(':')
+        nombre, valor = nombre.strip().lower(), valor.strip().lower()
+        if nombre == 'content-length':
+            largo = int(valor)
+        elif nombre == 'connection':
+            cerrar = valor == 'close'
+        elif nombre == 'transfer-encoding':
+            por_partes = valor == 'chunked'
+    if por_partes:
+        while (n := int((await lector.readline()).strip(), 16)):
+            await lector.readexactly(n + 2)
+        await lector.readline()
+    else:
+        await lector.readexactly(largo)
+    return estado, cerrar
+
+
+async def _cliente(puerto, fin, pedido, latencias, errores):
+    lector = escritor = None
+    while time.monotonic() < fin:
+        etiqueta, metodo, ruta, cuerpo, cabeceras = pedido()
+        inicio = time.perf_counter()
+        try:
+            if escritor is None:
+                lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+            estado, cerrar = await asyncio.wait_for(
+                _peticion(lector, escritor, metodo, ruta, cuerpo, cabeceras), 60)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError):
+            errores[etiqueta] += 1
+            if escritor is not None:
+                escritor.close()
+            escritor = None
+            await asyncio.sleep(0.01)
+            continue
+        if estado >= 500:
+            errores[etiqueta] += 1
+        else:
+            latencias.setdefault(etiqueta, []).append(time.perf_counter() - inicio)
+        if cerrar:
+            escritor.close()
+            escritor = None
+    if escritor is not None:
+        escritor.close()
+
+
+def cargar(puerto, clientes, segundos, pedido):
+    """
+    'clientes' conexiones concurrentes piden lo que devuelve pedido() durante 'segundos':
+    una tupla (etiqueta, método, ruta, cuerpo, cabeceras). Devuelve una fila por etiqueta
+    con peticiones/s, p50/p99 en ms y errores (5xx o de conexión).
+    """
+    latencias, errores = {}, Counter()
+
+    async def correr():
+        fin = time.monotonic() + segundos
+        await asyncio.gather(*(_cliente(puerto, fin, pedido, latencias, errores) for _ in range(clientes)))
+
+    asyncio.run(correr())
+    filas = []
+    for etiqueta in sorted(set(latencias) | set(errores)):
+        valores = latencias.get(etiqueta, [])
+        p50, p99 = percentil(valores, 50), percentil(valores, 99)
+        filas.append({
+            'ruta': etiqueta, 'peticiones': len(valores), 'req_s': len(valores) / segundos,
+            'p50_ms': p50 * 1000 if p50 is not None else None,
+            'p99_ms': p99 * 1000 if p99 is not None else None,
+            'errores': errores[etiqueta],
+        })
+    return filas
@@ -0,0 +1,61 @@
+# Exportación completa del catálogo (como antes, todo el archivo en cada exportación)
+# contra exportar_delta: una base NDJSON y luego sólo lo cambiado. Para cada volumen de
+# cambios se actualizan k productos, se registran los cambios y se mide el delta.
+#
+#   python bench/deltas.py --productos 1000000 --cambios 10 1000 100000
+import os
+import random
+import argparse
+from comun import entorno_temporal, poblar_productos, cronometro, tabla
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=1000000)
+    parser.add_argument('--cambios', type=int, nargs='+', default=[10, 1000, 100000])
+    args = parser.parse_args()
+
+    carpeta = entorno_temporal()
+    poblar_productos(args.productos)
+    from sqlalchemy import update, bindparam
+    from app import app
+    from modelos import db, Producto, registrar_cambios
+    from persistencia import exportar_productos, exportar_delta
+
+    deltas = os.path.join(carpeta, 'deltas')
+    azar = random.Random(0)
+    filas = []
+    with app.app_context():
+        for formato in ('json', 'csv'):
+            archivo = os.path.join(carpeta, f'productos.{formato}')
+            t = {}
+            with cronometro(t, 'segundos'):
+                exportar_productos(formato, archivo=archivo)
+            filas.append({'exportacion': f'completa ({formato})', 'filas': args.productos,
+                          'mb': os.path.getsize(archivo) / 2 ** 20, **t})
+
+        t = {}
+        with cronometro(t, 'segundos'):
+            entrada = exportar_delta(deltas, margen=0, base=True)
+        filas.append({'exportacion': 'base (ndjson)', 'filas': entrada['filas'],
+                      'mb': os.path.getsize(os.path.join(deltas, entrada['archivo'])) / 2 ** 20, **t})
+
+        tabla_productos = Producto.__table__
+        for k in args.cambios:
+            ids = azar.sample(range(1, args.productos + 1), min(k, args.productos))
+            db.session.execute(update(tabla_productos).where(tabla_productos.c.id == bindparam('_id')),
+                               [{'_id': pid, 'cantidad': azar.randint(0, 99)} for pid in ids])
+            registrar_cambios(ids)
+            db.session.commit()
+            t = {}
+            with cronometro(t, 'segundos'):
+                entrada = exportar_delta(deltas, margen=0)
+            filas.append({'exportacion': f'delta ({k} cambios)', 'filas': entrada['filas'],
+                          'mb': os.path.getsize(os.path.join(deltas, entrada['archivo'])) / 2 ** 20, **t})
+
+    print(f'{args.productos} productos')
+    tabla(filas, ['exportacion', 'filas', 'mb', 'segundos'])
+
+
+if __name__ == '__main__':
+    main()
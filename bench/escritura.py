@@ -0,0 +1,64 @@
+# Escrituras por segundo al cambiar cantidades con Inventario.actualizar() en SQLite:
+#   antes:      journal DELETE + synchronous FULL, un commit por cambio
+#   wal:        los PRAGMAS_SQLITE de modelos (WAL + synchronous NORMAL), un commit por cambio
+#   diferida:   WAL + INVENTARIO_ESCRITURA_DIFERIDA (cambios agrupados por transacción)
+# Cada escenario corre en su propio proceso: el engine y los pragmas se fijan al importar la app.
+#
+#   python bench/escritura.py --cambios 20000
+import sys
+import json
+import random
+import argparse
+import subprocess
+from comun import entorno_temporal, poblar_productos, cronometro, tabla
+
+ESCENARIOS = ('antes', 'wal', 'diferida')
+PRAGMAS_ANTES = ('PRAGMA journal_mode=DELETE', 'PRAGMA synchronous=FULL', 'PRAGMA busy_timeout=5000')
+
+
+def correr(escenario, productos, cambios):
+    entorno_temporal(INVENTARIO_ESCRITURA_DIFERIDA='1' if escenario == 'diferida' else '0')
+    if escenario == 'antes':
+        import modelos
+        modelos.PRAGMAS_SQLITE = PRAGMAS_ANTES
+    poblar_productos(productos)
+    from app import app, inventario
+    from modelos import db
+
+    azar = random.Random(0)
+    ids = [azar.randint(1, productos) for _ in range(cambios)]
+    with app.app_context():
+        inventario.sincronizar()
+        modo = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        t = {}
+        with cronometro(t, 'segundos'):
+            for i, pid in enumerate(ids):
+                inventario.actualizar(pid, cantidad=i % 1000)
+            inventario.vaciar_pendientes()
+    return {'escenario': escenario, 'journal': modo, 'cambios': cambios,
+            'cambios_s': cambios / t['segundos'], **t}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=100000)
+    parser.add_argument('--cambios', type=int, default=20000)
+    parser.add_argument('--escenario', choices=ESCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.escenario:
+        print(json.dumps(correr(args.escenario, args.productos, args.cambios)))
+        return
+
+    filas = []
+    for escenario in ESCENARIOS:
+        salida = subprocess.run([sys.executable, __file__, '--escenario', escenario,
+                                 '--productos', str(args.productos), '--cambios', str(args.cambios)],
+                                check=True, capture_output=True, text=True).stdout
+        filas.append(json.loads(salida.splitlines()[-1]))
+    print(f'{args.productos} productos, {args.cambios} cambios de cantidad')
+    tabla(filas, ['escenario', 'journal', 'cambios', 'segundos', 'cambios_s'])
+
+
+if __name__ == '__main__':
+    main()
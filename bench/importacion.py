@@ -0,0 +1,60 @@
+# Importación masiva: filas por segundo al importar un archivo sintético (todo
+# inserciones) y al volver a importarlo (todo actualizaciones), memoria máxima del
+# proceso, y la carga de antes (un commit por producto) sobre una muestra.
+#
+#   python bench/importacion.py --productos 1000000 --formato csv
+import os
+import argparse
+import resource
+from comun import entorno_temporal, fila_producto, cronometro, tabla
+
+
+def rss_max_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB en Linux
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=1000000)
+    parser.add_argument('--formato', choices=('txt', 'json', 'csv'), default='csv')
+    parser.add_argument('--lote', type=int, default=1000)
+    parser.add_argument('--muestra', type=int, default=2000, help='filas para la carga de a una')
+    args = parser.parse_args()
+
+    carpeta = entorno_temporal()
+    from app import app, crear_tablas
+    from modelos import db, Producto
+    from persistencia import exportar_productos
+    from importacion import importar_archivo
+
+    archivo = os.path.join(carpeta, f'productos.{args.formato}')
+    exportar_productos(args.formato, filas=((i + 1, *fila_producto(i).values()) for i in range(args.productos)),
+                       archivo=archivo)
+    resultados = []
+    with app.app_context():
+        crear_tablas()
+        rss_inicial = rss_max_mb()
+        for paso in ('inserta', 'actualiza'):
+            t = {}
+            with cronometro(t, 'segundos'):
+                resumen = importar_archivo(archivo, args.formato, tamano_lote=args.lote)
+            assert resumen['rechazados'] == 0
+            resultados.append({'carga': f'importar ({paso})', 'filas': args.productos,
+                               'filas_s': args.productos / t['segundos'], 'rss_max_mb': rss_max_mb(), **t})
+
+        # como antes de la importación por lotes: un objeto y un commit por producto
+        t = {}
+        with cronometro(t, 'segundos'):
+            for i in range(args.muestra):
+                db.session.add(Producto(nombre=f'Ingenuo {i:07d}', cantidad=i % 100, precio=1.0))
+                db.session.commit()
+        resultados.append({'carga': 'un commit por fila', 'filas': args.muestra,
+                           'filas_s': args.muestra / t['segundos'], 'rss_max_mb': rss_max_mb(), **t})
+
+    print(f'{args.productos} filas {args.formato.upper()} ({os.path.getsize(archivo) / 2 ** 20:.1f} MB), '
+          f'lotes de {args.lote}; RSS antes de importar: {rss_inicial:.1f} MB')
+    tabla(resultados, ['carga', 'filas', 'segundos', 'filas_s', 'rss_max_mb'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Ráfaga de logins (hash scrypt por intento) junto a clientes que leen el catálogo:
+# con PASSWORD_PROCESOS=0 el hash corre en el hilo de la petición y se disputa el GIL
+# con el resto del worker; con procesos aparte, el catálogo no debería sufrir.
+# Reporta logins por segundo y p99 del catálogo en cada caso (gthread).
+#
+#   python bench/login.py --logins 16 --catalogo 64 --segundos 15
+#
+# Los rechazos por saturación (Saturado) responden con una plantilla y cuentan como errores.
+import argparse
+import threading
+from comun import entorno_temporal, poblar_productos, servidor, cargar, formulario, tabla
+
+EMAIL, PASSWORD = 'login@ejemplo.com', 'clave-de-login'
+
+
+def preparar(productos):
+    poblar_productos(productos)
+    from app import app, hashes, repositorio
+    with app.app_context():
+        repositorio.crear_usuario('Login', EMAIL, hashes.generar(PASSWORD))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=16, help='clientes haciendo login sin parar')
+    parser.add_argument('--catalogo', type=int, default=64, help='clientes leyendo el catálogo')
+    parser.add_argument('--segundos', type=float, default=15)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--productos', type=int, default=10000)
+    parser.add_argument('--puerto', type=int, default=8767)
+    args = parser.parse_args()
+
+    # el hash usa el PASSWORD_METODO por defecto; sólo se sube el límite por IP
+    entorno_temporal(LOGIN_INTENTOS_IP=10 ** 9)
+    preparar(args.productos)
+    cuerpo, cabeceras = formulario({'email': EMAIL, 'password': PASSWORD})
+    pedidos = [
+        (args.logins, lambda: ('login', 'POST', '/login', cuerpo, cabeceras)),
+        (args.catalogo, lambda: ('catalogo', 'GET', '/api/v1/productos?limit=20', None, {})),
+    ]
+
+    for procesos in (0, 2):
+        with servidor(args.puerto, GUNICORN_WORKER_CLASS='gthread', GUNICORN_WORKERS=args.workers,
+                      GUNICORN_THREADS=args.hilos, PASSWORD_PROCESOS=procesos):
+            # dos grupos de clientes a la vez, cada uno con su propio loop de asyncio
+            filas = []
+            hilos = [threading.Thread(target=lambda n=n, p=p: filas.extend(cargar(args.puerto, n, args.segundos, p)))
+                     for n, p in pedidos]
+            for h in hilos:
+                h.start()
+            for h in hilos:
+                h.join()
+            filas.sort(key=lambda f: f['ruta'])
+        print(f'PASSWORD_PROCESOS={procesos}: {args.workers} workers x {args.hilos} hilos, '
+              f'{args.logins} clientes de login + {args.catalogo} de catálogo, {args.segundos:.0f} s')
+        tabla(filas, ['ruta', 'peticiones', 'req_s', 'p50_ms', 'p99_ms', 'errores'])
+        print()
+
+
+if __name__ == '__main__':
+    main()
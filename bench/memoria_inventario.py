@@ -0,0 +1,59 @@
+# Memoria del catálogo en el cache: instancias Producto del ORM (como antes, con su
+# estado y el identity map de la sesión) contra ProductoLigero e índices de Inventario.
+# Mide lo asignado por Python con tracemalloc y el tiempo de carga desde la BD.
+#
+#   python bench/memoria_inventario.py --productos 1000000
+import gc
+import argparse
+import tracemalloc
+from comun import entorno_temporal, poblar_productos, cronometro, tabla
+
+
+def medir(nombre, cargar, n):
+    gc.collect()
+    tracemalloc.start()
+    t = {}
+    with cronometro(t, 'carga_s'):
+        datos = cargar()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    fila = {'cache': nombre, 'mb': actual / 2 ** 20, 'bytes_por_producto': round(actual / n), **t}
+    del datos
+    gc.collect()
+    return fila
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=1000000)
+    args = parser.parse_args()
+
+    entorno_temporal()
+    poblar_productos(args.productos)
+    from app import app
+    from modelos import db, Producto
+    from inventario import Inventario
+
+    def orm():
+        # lo que guardaba Inventario antes: {id: Producto} con la sesión viva
+        return {p.id: p for p in db.session.query(Producto).all()}, db.session
+
+    with app.app_context():
+        filas = [medir('Producto (ORM)', orm, args.productos)]
+        db.session.remove()
+        filas.append(medir('ProductoLigero (solo registros)',
+                           lambda: {f[0]: f for f in Inventario.cargar_desde_bd().productos.values()},
+                           args.productos))
+        filas.append(medir('Inventario (registros e índices)', Inventario.cargar_desde_bd, args.productos))
+
+        def con_trigramas():
+            inventario = Inventario.cargar_desde_bd()
+            inventario.buscar_por_nombre('producto 00', limit=20)  # arma el índice de trigramas
+            return inventario
+        filas.append(medir('Inventario + trigramas (tras buscar)', con_trigramas, args.productos))
+    print(f'{args.productos} productos')
+    tabla(filas, ['cache', 'mb', 'bytes_por_producto', 'carga_s'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# Snapshot binario contra TXT/JSON/CSV: tamaño en disco, tiempo de escritura, tiempo
+# de carga completa al cache (dict id -> ProductoLigero, como Inventario) y tiempo de
+# abrir el archivo y leer productos sueltos por id.
+#
+#   python bench/snapshot.py --productos 1000000
+import os
+import random
+import argparse
+import tempfile
+from comun import fila_producto, cronometro, tabla
+from persistencia import exportar_productos, exportar_snapshot, LECTORES, SnapshotCatalogo
+from inventario import ProductoLigero
+
+
+def filas(n):
+    return ((i + 1, *fila_producto(i).values()) for i in range(n))
+
+
+def cargar_texto(formato, archivo):
+    return {int(p['id']): ProductoLigero(int(p['id']), p['nombre'], int(p['cantidad']), float(p['precio']))
+            for p in LECTORES[formato](archivo)}
+
+
+def cargar_snapshot(archivo):
+    with SnapshotCatalogo(archivo) as snap:
+        return {f[0]: ProductoLigero(*f) for f in snap}
+
+
+def buscar_texto(formato, archivo, ids):
+    # sin índice: hay que recorrer el archivo hasta encontrar cada id
+    buscados = {str(i) for i in ids}
+    return [p for p in LECTORES[formato](archivo) if str(p['id']) in buscados]
+
+
+def buscar_snapshot(archivo, ids):
+    with SnapshotCatalogo(archivo, verificar=False) as snap:
+        return [snap.buscar(i) for i in ids]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=1000000)
+    parser.add_argument('--buscados', type=int, default=1000, help='ids sueltos a leer')
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='bench-snapshot-')
+    ids = random.sample(range(1, args.productos + 1), min(args.buscados, args.productos))
+    resultados = []
+    for formato in ('txt', 'json', 'csv', 'snapshot'):
+        archivo = os.path.join(carpeta, f'productos.{formato}')
+        t = {}
+        with cronometro(t, 'escritura_s'):
+            if formato == 'snapshot':
+                exportar_snapshot(archivo, filas=filas(args.productos), revision=0)
+            else:
+                exportar_productos(formato, filas=filas(args.productos), archivo=archivo)
+        with cronometro(t, 'carga_s'):
+            cache = cargar_snapshot(archivo) if formato == 'snapshot' else cargar_texto(formato, archivo)
+        assert len(cache) == args.productos
+        del cache
+        with cronometro(t, 'buscar_s'):
+            encontrados = buscar_snapshot(archivo, ids) if formato == 'snapshot' else buscar_texto(formato, archivo, ids)
+        assert len(encontrados) == len(ids)
+        resultados.append({'formato': formato, 'mb': os.path.getsize(archivo) / 2 ** 20, **t})
+        os.remove(archivo)
+    os.rmdir(carpeta)
+    print(f'{args.productos} productos; buscar = abrir y leer {len(ids)} ids sueltos')
+    tabla(resultados, ['formato', 'mb', 'escritura_s', 'carga_s', 'buscar_s'])
+
+
+if __name__ == '__main__':
+    main()
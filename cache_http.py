@@ -0,0 +1,82 @@
+# Cache HTTP: ETag fuerte + 304, y cache LRU de respuestas/fragmentos renderizados.
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session, make_response
+
+
+class CacheLRU:
+    """Dict acotado: al pasar de 'max_entradas' se descarta lo menos usado."""
+    def __init__(self, max_entradas=256):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return self._datos[clave]
+            self.fallos += 1
+            return None
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def __len__(self):
+        return len(self._datos)
+
+    def descartar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+
+def _usuario():
+    # la página puede variar según quién está logueado (menú, etc.)
+    return session.get('_user_id', '')
+
+
+def calcular_etag(*partes):
+    texto = '|'.join(str(p) for p in (request.endpoint, request.full_path, _usuario()) + partes)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:20]
+
+
+def cachear(version, cache_control='private, no-cache', cache=None):
+    """
+    Decorador de vistas GET.
+    - version(): función barata que cambia cuando cambia el contenido (p. ej. versión del catálogo).
+    - Si el ETag coincide con If-None-Match se responde 304 sin ejecutar la vista.
+    - Con 'cache' (CacheLRU) se guarda la respuesta completa y se sirve sin renderizar.
+    Las respuestas con mensajes flash pendientes no se cachean.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            if session.get('_flashes'):
+                return vista(*args, **kwargs)
+            etag = calcular_etag(version())
+            if etag in request.if_none_match:
+                respuesta = make_response('', 304)
+            else:
+                guardada = cache.obtener(etag) if cache is not None else None
+                if guardada is not None:
+                    respuesta = make_response(guardada)
+                else:
+                    respuesta = make_response(vista(*args, **kwargs))
+                    if respuesta.status_code != 200 or session.get('_flashes'):
+                        return respuesta
+                    if cache is not None:
+                        cache.guardar(etag, respuesta.get_data())
+            respuesta.set_etag(etag)
+            respuesta.headers['Cache-Control'] = cache_control
+            return respuesta
+        return envoltura
+    return decorador
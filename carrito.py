@@ -0,0 +1,176 @@
+# Almacenes de carritos del lado del servidor.
+# La sesión (cookie) guarda solo 'carrito_id'; las líneas viven aquí.
+import time
+import secrets
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete
+from modelos import db, Producto, Carrito, CarritoLinea
+
+
+def precios_actuales(lineas):
+    """Une {producto_id: cantidad} con los precios vigentes en una sola consulta.
+    Devuelve (items, total) con items {str(id): {'id','nombre','precio','cantidad'}}."""
+    if not lineas:
+        return {}, 0.0
+    filas = db.session.execute(
+        select(Producto.id, Producto.nombre, Producto.precio).where(Producto.id.in_(list(lineas)))
+    )
+    items = {}
+    for pid, nombre, precio in filas:
+        items[str(pid)] = {'id': pid, 'nombre': nombre, 'precio': float(precio), 'cantidad': lineas[pid]}
+    return items, sum(i['precio'] * i['cantidad'] for i in items.values())
+
+
+class AlmacenCarritoMemoria:
+    """Carritos en un dict del proceso. Para pruebas o un solo worker."""
+    def __init__(self, expira=timedelta(days=7)):
+        self.expira = expira.total_seconds()
+        self._carritos = {}  # id -> [momento, {producto_id: cantidad}]
+        self._lock = threading.Lock()
+
+    def crear(self):
+        cid = secrets.token_hex(16)
+        with self._lock:
+            self._carritos[cid] = [time.time(), {}]
+        return cid
+
+    def existe(self, cid):
+        with self._lock:
+            c = self._carritos.get(cid)
+            return c is not None and time.time() - c[0] <= self.expira
+
+    def lineas(self, cid):
+        with self._lock:
+            c = self._carritos.get(cid)
+            return dict(c[1]) if c else {}
+
+    def agregar(self, cid, pid, cantidad):
+        with self._lock:
+            c = self._carritos.setdefault(cid, [time.time(), {}])
+            c[0] = time.time()
+            c[1][pid] = c[1].get(pid, 0) + cantidad
+
+    def quitar(self, cid, pid):
+        with self._lock:
+            c = self._carritos.get(cid)
+            if not c or pid not in c[1]:
+                return False
+            del c[1][pid]
+            c[0] = time.time()
+            return True
+
+    def vaciar(self, cid):
+        with self._lock:
+            self._carritos.pop(cid, None)
+
+    def detalle(self, cid):
+        return precios_actuales(self.lineas(cid))
+
+    def purgar(self):
+        limite = time.time() - self.expira
+        with self._lock:
+            viejos = [cid for cid, c in self._carritos.items() if c[0] < limite]
+            for cid in viejos:
+                del self._carritos[cid]
+        return len(viejos)
+
+
+class AlmacenCarritoBD:
+    """Carritos en las tablas 'carritos' / 'carrito_lineas' de la BD de la app."""
+    def __init__(self, expira=timedelta(days=7)):
+        self.expira = expira
+
+    def crear(self):
+        cid = secrets.token_hex(16)
+        db.session.add(Carrito(id=cid))
+        db.session.commit()
+        return cid
+
+    def existe(self, cid):
+        actualizado = db.session.scalar(select(Carrito.actualizado).where(Carrito.id == cid))
+        return actualizado is not None and datetime.utcnow() - actualizado <= self.expira
+
+    def lineas(self, cid):
+        filas = db.session.execute(
+            select(CarritoLinea.producto_id, CarritoLinea.cantidad).where(CarritoLinea.carrito_id == cid)
+        )
+        return dict(filas.all())
+
+    def agregar(self, cid, pid, cantidad):
+        # una sola sentencia que inserta la línea o suma a la existente: dos agregados
+        # simultáneos del mismo producto (doble clic, dos pestañas) no chocan con la clave
+        self._tocar(cid)
+        db.session.execute(_insertar(CarritoLinea.__table__), {'carrito_id': cid, 'producto_id': pid, 'cantidad': cantidad})
+        db.session.commit()
+
+    def quitar(self, cid, pid):
+        r = db.session.execute(
+            delete(CarritoLinea).where(CarritoLinea.carrito_id == cid, CarritoLinea.producto_id == pid)
+        )
+        self._tocar(cid)
+        db.session.commit()
+        return r.rowcount > 0
+
+    def vaciar(self, cid):
+        db.session.execute(delete(CarritoLinea).where(CarritoLinea.carrito_id == cid))
+        db.session.execute(delete(Carrito).where(Carrito.id == cid))
+        db.session.commit()
+
+    def detalle(self, cid):
+        # líneas y precios vigentes en una sola consulta
+        filas = db.session.execute(
+            select(Producto.id, Producto.nombre, Producto.precio, CarritoLinea.cantidad)
+            .join(CarritoLinea, CarritoLinea.producto_id == Producto.id)
+            .where(CarritoLinea.carrito_id == cid)
+        )
+        items = {}
+        for pid, nombre, precio, cantidad in filas:
+            items[str(pid)] = {'id': pid, 'nombre': nombre, 'precio': float(precio), 'cantidad': cantidad}
+        return items, sum(i['precio'] * i['cantidad'] for i in items.values())
+
+    def purgar(self):
+        limite = datetime.utcnow() - self.expira
+        viejos = select(Carrito.id).where(Carrito.actualizado < limite)
+        db.session.execute(delete(CarritoLinea).where(CarritoLinea.carrito_id.in_(viejos)))
+        r = db.session.execute(delete(Carrito).where(Carrito.actualizado < limite))
+        db.session.commit()
+        return r.rowcount
+
+    def _tocar(self, cid):
+        r = db.session.execute(
+            update(Carrito).where(Carrito.id == cid).values(actualizado=datetime.utcnow())
+        )
+        if r.rowcount == 0:
+            db.session.execute(_insertar(Carrito.__table__, ignorar=True), {'id': cid})
+
+
+def _insertar(tabla, ignorar=False):
+    # INSERT que suma la cantidad a la línea existente (o no hace nada con ignorar=True)
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as insert_mysql
+        stmt = insert_mysql(tabla)
+        if ignorar:
+            return stmt.prefix_with('IGNORE')
+        return stmt.on_duplicate_key_update(cantidad=tabla.c.cantidad + stmt.inserted.cantidad)
+    if dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+    elif dialecto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+    else:
+        raise RuntimeError(f'Upsert no soportado para {dialecto}')
+    stmt = insert_dialecto(tabla)
+    if ignorar:
+        return stmt.on_conflict_do_nothing()
+    return stmt.on_conflict_do_update(index_elements=[c.name for c in tabla.primary_key],
+                                      set_={'cantidad': tabla.c.cantidad + stmt.excluded.cantidad})
+
+
+ALMACENES = {'memoria': AlmacenCarritoMemoria, 'bd': AlmacenCarritoBD}
+
+
+def crear_almacen(nombre, expira_dias=7):
+    if nombre not in ALMACENES:
+        raise ValueError(f'Almacén de carrito desconocido: {nombre}')
+    return ALMACENES[nombre](expira=timedelta(days=expira_dias))
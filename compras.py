@@ -0,0 +1,88 @@
+# Motor de compras: registra todas las líneas de un carrito en una sola transacción.
+import time
+from sqlalchemy import select, update, insert, case
+from sqlalchemy.exc import OperationalError
+from modelos import db, Producto, Compra, registrar_cambios
+from estadisticas import registrar_venta
+
+# errores que se pueden reintentar: deadlock y espera de bloqueo agotada (MySQL),
+# base de datos bloqueada (SQLite)
+ERRORES_REINTENTABLES = {1213, 1205}
+
+
+def _reintentable(error):
+    orig = getattr(error, 'orig', None)
+    return (getattr(orig, 'errno', None) in ERRORES_REINTENTABLES
+            or 'database is locked' in str(orig))
+
+
+def comprar_lineas(usuario_id, lineas, inventario=None, reintentos=3):
+    """
+    lineas: dict {producto_id: cantidad}.
+    Devuelve (ok, resultados) con un dict por línea:
+    {'producto_id', 'cantidad', 'disponible', 'ok'}.
+    Si alguna línea no tiene stock no se compra nada (todo o nada).
+    El cambio de stock queda en 'cambios_productos' en la misma transacción;
+    con 'inventario' además se sincroniza el cache de este worker.
+    """
+    lineas = {int(pid): int(cant) for pid, cant in lineas.items() if int(cant) > 0}
+    if not lineas:
+        return False, []
+    ids = sorted(lineas)  # orden fijo de bloqueo para reducir deadlocks
+    for intento in range(reintentos + 1):
+        try:
+            ok, resultados = _comprar(usuario_id, ids, lineas)
+            break
+        except OperationalError as e:
+            db.session.rollback()
+            if not _reintentable(e) or intento == reintentos:
+                raise
+            time.sleep(0.01 * 2 ** intento)
+        except Exception:
+            db.session.rollback()
+            raise
+    if ok and inventario is not None:
+        inventario.sincronizar(forzar=True)
+    return ok, resultados
+
+
+def _comprar(usuario_id, ids, lineas):
+    cantidades = case(lineas, value=Producto.id)
+    # descuento condicional: solo se tocan filas con stock suficiente
+    r = db.session.execute(
+        update(Producto)
+        .where(Producto.id.in_(ids), Producto.cantidad >= cantidades)
+        .values(cantidad=Producto.cantidad - cantidades)
+        .execution_options(synchronize_session=False)
+    )
+    if r.rowcount != len(ids):
+        # alguna línea falló: deshacer y averiguar cuál con una sola consulta
+        db.session.rollback()
+        disponibles = dict(db.session.execute(
+            select(Producto.id, Producto.cantidad).where(Producto.id.in_(ids))
+        ).all())
+        return False, _resultados(ids, lineas, disponibles)
+
+    # executemany: un único INSERT de varias filas en MySQL
+    db.session.execute(insert(Compra), [{'usuario_id': usuario_id, 'producto_id': pid, 'cantidad': lineas[pid]}
+                                        for pid in ids])
+    registrar_cambios(ids)  # registro de cambios y revisión de cada producto
+    registrar_venta(lineas)  # contadores del dashboard, en la misma transacción
+    db.session.commit()
+    return True, _resultados(ids, lineas, None)
+
+
+def _resultados(ids, lineas, disponibles):
+    resultados = []
+    for pid in ids:
+        if disponibles is None:
+            resultados.append({'producto_id': pid, 'cantidad': lineas[pid], 'disponible': None, 'ok': True})
+        else:
+            disponible = disponibles.get(pid)
+            resultados.append({
+                'producto_id': pid,
+                'cantidad': lineas[pid],
+                'disponible': disponible,  # None si el producto ya no existe
+                'ok': disponible is not None and disponible >= lineas[pid],
+            })
+    return resultados
@@ -0,0 +1,134 @@
+# Hash de contraseñas fuera del hilo de la petición.
+# scrypt/pbkdf2 son caros a propósito: se calculan en un pool de procesos acotado por
+# worker (usa varios núcleos y deja el hilo libre de CPU), y los intentos de login se
+# limitan por cuenta y por IP antes de hacer cualquier hash.
+import os
+import time
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class Saturado(Exception):
+    """Hay demasiados hashes en curso: se rechaza en lugar de acumular espera."""
+
+
+class ServicioHash:
+    """
+    'metodo' es el de werkzeug con su costo, p. ej. 'scrypt:32768:8:1' o 'pbkdf2:sha256:600000'.
+    Con procesos=0 el hash se calcula en el mismo hilo (desarrollo).
+    A lo sumo 'max_pendientes' hashes a la vez por worker; el resto espera 'espera'
+    segundos un lugar y si no lo consigue recibe Saturado.
+    """
+    def __init__(self, metodo='scrypt:32768:8:1', procesos=2, max_pendientes=32, espera=2.0):
+        self.metodo = metodo
+        self.procesos = procesos
+        self.espera = espera
+        self._cupos = threading.BoundedSemaphore(max_pendientes)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._prefijo = None
+        self.calculados = 0
+        self.rechazados = 0
+        self.rehashes = 0
+
+    def _ejecutor(self):
+        # un pool por proceso: el creado antes del fork de gunicorn no sirve en el hijo
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                metodos = multiprocessing.get_all_start_methods()
+                # no se hace fork del worker (tiene hilos y conexiones abiertas): los procesos
+                # salen de un servidor limpio que solo importa werkzeug
+                contexto = multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+                if contexto.get_start_method() == 'forkserver':
+                    contexto.set_forkserver_preload(['werkzeug.security'])
+                self._pool = ProcessPoolExecutor(self.procesos, mp_context=contexto)
+                self._pid = os.getpid()
+            return self._pool
+
+    def _ejecutar(self, funcion, *args):
+        if not self._cupos.acquire(timeout=self.espera):
+            self.rechazados += 1
+            raise Saturado()
+        try:
+            self.calculados += 1
+            if self.procesos <= 0:
+                return funcion(*args)
+            return self._ejecutor().submit(funcion, *args).result()
+        finally:
+            self._cupos.release()
+
+    def generar(self, password):
+        return self._ejecutar(generate_password_hash, password, self.metodo)
+
+    def prefijo(self):
+        # 'metodo' completo tal como queda en el hash (werkzeug completa los parámetros que falten)
+        if self._prefijo is None:
+            self._prefijo = generate_password_hash('', self.metodo).split('$', 1)[0]
+        return self._prefijo
+
+    def verificar(self, password_hash, password):
+        """
+        Devuelve (ok, nuevo_hash). nuevo_hash no es None cuando la contraseña es correcta
+        pero el hash guardado tiene otro método o costo: hay que guardarlo en su lugar.
+        """
+        if not self._ejecutar(check_password_hash, password_hash, password):
+            return False, None
+        if password_hash.split('$', 1)[0] == self.prefijo():
+            return True, None
+        self.rehashes += 1
+        return True, self.generar(password)
+
+    def metricas(self):
+        return {'calculados': self.calculados, 'rechazados': self.rechazados, 'rehashes': self.rehashes}
+
+
+class Limitador:
+    """
+    Ventana deslizante de intentos por clave (una IP o un email), en memoria del worker.
+    Cada worker cuenta por su lado: con N workers el límite efectivo llega a N veces
+    'max_intentos', según cómo reparta las peticiones gunicorn.
+    Se guardan a lo sumo 'max_claves' claves; las más viejas se descartan.
+    """
+    def __init__(self, max_intentos, ventana, max_claves=100000):
+        self.max_intentos = max_intentos
+        self.ventana = ventana
+        self.max_claves = max_claves
+        self._intentos = OrderedDict()
+        self._lock = threading.Lock()
+        self.bloqueos = 0
+
+    def espera(self, clave):
+        """Segundos que faltan para poder intentar de nuevo (0 si se puede ya)."""
+        ahora = time.monotonic()
+        with self._lock:
+            intentos = self._intentos.get(clave)
+            if not intentos:
+                return 0
+            while intentos and ahora - intentos[0] >= self.ventana:
+                intentos.popleft()
+            if len(intentos) < self.max_intentos:
+                return 0
+            self.bloqueos += 1
+            return int(self.ventana - (ahora - intentos[0])) + 1
+
+    def registrar(self, clave):
+        with self._lock:
+            intentos = self._intentos.get(clave)
+            if intentos is None:
+                intentos = self._intentos[clave] = deque(maxlen=self.max_intentos)
+                if len(self._intentos) > self.max_claves:
+                    self._intentos.popitem(last=False)
+            else:
+                self._intentos.move_to_end(clave)
+            intentos.append(time.monotonic())
+
+    def limpiar(self, clave):
+        with self._lock:
+            self._intentos.pop(clave, None)
+
+    def __len__(self):
+        return len(self._intentos)
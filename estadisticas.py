@@ -0,0 +1,104 @@
+# Contadores del dashboard mantenidos de forma incremental en 'resumen_tienda'.
+# Las rutas de compra y registro los actualizan dentro de su propia transacción;
+# el dashboard los lee con una consulta de pocas filas y un cache en memoria.
+import time
+import random
+import threading
+from sqlalchemy import select, delete, func, case
+from modelos import db, Producto, UsuarioBD, Compra, ResumenTienda
+
+SLOTS = 8          # filas por contador para repartir la contención
+SLOT_BASE = 255    # fila con el conteo inicial calculado al crear la tabla
+CLAVES = ('usuarios', 'compras', 'unidades_vendidas', 'ingresos')
+ENTEROS = ('usuarios', 'compras', 'unidades_vendidas')  # 'valor' es Numeric: llegan como Decimal
+
+
+def _insertar(ignorar=False):
+    # INSERT que suma al valor existente (o lo deja como está con ignorar=True)
+    tabla = ResumenTienda.__table__
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as insert_mysql
+        stmt = insert_mysql(tabla)
+        if ignorar:
+            return stmt.prefix_with('IGNORE')
+        return stmt.on_duplicate_key_update(valor=tabla.c.valor + stmt.inserted.valor)
+    if dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+    elif dialecto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+    else:
+        raise RuntimeError(f'Upsert no soportado para {dialecto}')
+    stmt = insert_dialecto(tabla)
+    if ignorar:
+        return stmt.on_conflict_do_nothing(index_elements=['clave', 'slot'])
+    return stmt.on_conflict_do_update(index_elements=['clave', 'slot'],
+                                      set_={'valor': tabla.c.valor + stmt.excluded.valor})
+
+
+def _sumar(**deltas):
+    slot = random.randrange(SLOTS)
+    db.session.execute(_insertar(), [{'clave': clave, 'slot': slot, 'valor': delta}
+                                     for clave, delta in deltas.items()])
+
+
+def registrar_usuario():
+    _sumar(usuarios=1)
+
+
+def registrar_venta(lineas):
+    """lineas: {producto_id: cantidad}. Suma compras, unidades e ingresos (a precio actual)
+    sin confirmar: el commit lo hace quien registra la compra."""
+    ingresos = db.session.scalar(
+        select(func.coalesce(func.sum(Producto.precio * case(lineas, value=Producto.id)), 0))
+        .where(Producto.id.in_(list(lineas)))
+    )
+    _sumar(compras=len(lineas), unidades_vendidas=sum(lineas.values()), ingresos=ingresos)
+
+
+def conteo_inicial():
+    # se ignora si ya existe: si otro worker ya lo calculó no se duplica
+    ingresos = (select(func.coalesce(func.sum(Compra.cantidad * Producto.precio), 0))
+                .join(Producto, Producto.id == Compra.producto_id))
+    valores = {
+        'usuarios': db.session.scalar(select(func.count()).select_from(UsuarioBD)),
+        'compras': db.session.scalar(select(func.count()).select_from(Compra)),
+        'unidades_vendidas': db.session.scalar(select(func.coalesce(func.sum(Compra.cantidad), 0))),
+        'ingresos': db.session.scalar(ingresos),
+    }
+    db.session.execute(_insertar(ignorar=True), [{'clave': clave, 'slot': SLOT_BASE, 'valor': valor}
+                                                for clave, valor in valores.items()])
+
+
+def reconstruir():
+    # recalcula todo desde las tablas (p. ej. si se editaron datos a mano)
+    db.session.execute(delete(ResumenTienda))
+    conteo_inicial()
+    db.session.commit()
+
+
+class ResumenCache:
+    """Totales leídos de 'resumen_tienda', guardados 'ttl' segundos en el proceso."""
+    def __init__(self, ttl=5.0):
+        self.ttl = ttl
+        self._valores = None
+        self._leido = 0.0
+        self._lock = threading.Lock()
+
+    def obtener(self):
+        with self._lock:
+            if self._valores is not None and time.monotonic() - self._leido < self.ttl:
+                return self._valores
+        filas = db.session.execute(
+            select(ResumenTienda.clave, func.sum(ResumenTienda.valor)).group_by(ResumenTienda.clave)
+        )
+        valores = dict.fromkeys(CLAVES, 0)
+        for clave, total in filas:
+            valores[clave] = int(total) if clave in ENTEROS else total
+        with self._lock:
+            self._valores, self._leido = valores, time.monotonic()
+        return valores
+
+    def invalidar(self):
+        with self._lock:
+            self._valores = None
@@ -1,13 +1,59 @@
+import re
+import math
 from flask_wtf import FlaskForm
 from wtforms import StringField, IntegerField, DecimalField, SubmitField
-from wtforms.validators import DataRequired, NumberRange, Length
+from wtforms.validators import DataRequired, InputRequired, NumberRange, Length
+
+NOMBRE_MAX = 120
 
 class ProductoForm(FlaskForm):
-    nombre = StringField('Nombre', validators=[DataRequired(), Length(max=120)])
-    cantidad = IntegerField('Cantidad', validators=[DataRequired(), NumberRange(min=0)])
+    nombre = StringField('Nombre', validators=[DataRequired(), Length(max=NOMBRE_MAX)])
+    # InputRequired: un producto agotado (cantidad 0) se tiene que poder editar
+    cantidad = IntegerField('Cantidad', validators=[InputRequired(), NumberRange(min=0)])
     precio = DecimalField('Precio', places=2, validators=[DataRequired(), NumberRange(min=0)])
     submit = SubmitField('Guardar')
 
+
+def validar_producto(datos, parcial=False):
+    """Mismas reglas que ProductoForm para filas que no vienen de un formulario
+    (importación, API). Con parcial=True solo se validan los campos presentes.
+    Devuelve (producto, None) o (None, mensaje de error)."""
+    limpio = {}
+    if not parcial or datos.get('nombre') is not None:
+        nombre = str(datos.get('nombre') or '').strip()
+        if not nombre:
+            return None, 'El nombre es obligatorio.'
+        if len(nombre) > NOMBRE_MAX:
+            return None, f'El nombre supera {NOMBRE_MAX} caracteres.'
+        limpio['nombre'] = nombre
+    if not parcial or datos.get('cantidad') is not None:
+        cantidad = datos.get('cantidad')
+        if isinstance(cantidad, bool) or (isinstance(cantidad, float) and not cantidad.is_integer()):
+            return None, 'Cantidad inválida.'  # IntegerField tampoco acepta '1.5'
+        try:
+            cantidad = int(cantidad)
+        except (TypeError, ValueError, OverflowError):
+            return None, 'Cantidad inválida.'
+        if cantidad < 0:
+            return None, 'La cantidad no puede ser negativa.'
+        limpio['cantidad'] = cantidad
+    if not parcial or datos.get('precio') is not None:
+        precio = datos.get('precio')
+        if isinstance(precio, bool):
+            return None, 'Precio inválido.'
+        try:
+            precio = round(float(precio), 2)  # places=2 como el DecimalField
+        except (TypeError, ValueError):
+            return None, 'Precio inválido.'
+        if not math.isfinite(precio):
+            return None, 'Precio inválido.'
+        if precio < 0:
+            return None, 'El precio no puede ser negativo.'
+        if precio == 0:  # DataRequired del formulario rechaza 0
+            return None, 'El precio es obligatorio.'
+        limpio['precio'] = precio
+    return limpio, None
+
 # formularios para clientes.
 from flask_wtf import FlaskForm
 from wtforms import StringField, SubmitField
@@ -18,3 +64,23 @@ class ClienteForm(FlaskForm):
     direccion = StringField('Dirección', validators=[DataRequired(), Length(max=200)])
     correo_electronico = StringField('Correo Electrónico', validators=[DataRequired(), Email(), Length(max=120)])
     submit = SubmitField('Guardar')
+
+
+CORREO_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def validar_cliente(datos, parcial=False):
+    """Mismas reglas que ClienteForm para datos que llegan por la API."""
+    limpio = {}
+    for campo, maximo in (('nombre', 120), ('direccion', 200), ('correo_electronico', 120)):
+        if parcial and datos.get(campo) is None:
+            continue
+        valor = str(datos.get(campo) or '').strip()
+        if not valor:
+            return None, f'El campo {campo} es obligatorio.'
+        if len(valor) > maximo:
+            return None, f'El campo {campo} supera {maximo} caracteres.'
+        limpio[campo] = valor
+    if 'correo_electronico' in limpio and not CORREO_RE.match(limpio['correo_electronico']):
+        return None, 'Correo electrónico inválido.'
+    return limpio, None
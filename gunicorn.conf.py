@@ -0,0 +1,57 @@
+# Configuración de gunicorn (se carga sola al ejecutar `gunicorn app:app` en esta carpeta).
+# Las rutas de compras y login pasan casi todo el tiempo esperando a MySQL; con workers
+# 'sync' cada espera ocupa un worker completo. Con 'gevent' (o 'gthread') un mismo
+# proceso atiende muchas peticiones mientras otras esperan a la base de datos.
+#
+#   GUNICORN_WORKER_CLASS=gevent gunicorn app:app
+import os
+import multiprocessing
+
+# en Heroku el puerto llega en PORT y la cantidad de workers en WEB_CONCURRENCY (según el
+# tamaño del dyno): cada worker tiene su propio catálogo en memoria
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')  # sync | gthread | gevent
+workers = int(os.environ.get('GUNICORN_WORKERS') or os.environ.get('WEB_CONCURRENCY')
+              or multiprocessing.cpu_count() * 2 + 1)
+threads = int(os.environ.get('GUNICORN_THREADS', 8 if worker_class == 'gthread' else 1))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+if worker_class == 'gevent':
+    # cada greenlet pide su conexión al pool: hay que dejar margen para las concurrentes
+    os.environ.setdefault('MYSQL_USE_PURE', '1')
+    os.environ.setdefault('DB_POOL_SIZE', '32')
+
+# Arranque de workers.
+# - Las tablas se crean al desplegar (`flask bd crear-tablas`, fase 'release' del Procfile)
+#   y cada worker las verifica al arrancar (CREAR_TABLAS_EN_WORKER), no al importar la app.
+# - Por defecto cada worker arranca sin catálogo y lo carga en segundo plano (post_worker_init).
+# - Con GUNICORN_PRELOAD=1 e INVENTARIO_CARGA=inicio el catálogo se carga una sola vez en
+#   el master y los workers lo heredan con copy-on-write.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0') == '1'
+
+
+def when_ready(server):
+    if preload_app:
+        import gc
+        # lo cargado en el master no lo recorre el GC de los workers: así no se
+        # tocan (ni copian) esas páginas de memoria después del fork
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    from app import app, db, calentar_en_fondo, ejecutor, preparar_bd
+    if preload_app:
+        # las conexiones SQLite abiertas en el master no se comparten con los hijos
+        with app.app_context():
+            db.engine.dispose(close=False)
+    if app.config['CREAR_TABLAS_EN_WORKER']:
+        preparar_bd()
+    calentar_en_fondo()
+    ejecutor.iniciar()  # hilos que corren los trabajos en segundo plano (TRABAJOS_HILOS)
+
+
+def worker_exit(server, worker):
+    # cambios de la escritura diferida que aún no se guardaron (INVENTARIO_ESCRITURA_DIFERIDA)
+    from app import inventario
+    inventario.vaciar_pendientes()
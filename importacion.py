@@ -0,0 +1,99 @@
+# Importación masiva de productos desde TXT/JSON/CSV.
+from sqlalchemy import select, update, func
+from modelos import db, Producto, registrar_cambios
+from formularios import validar_producto
+from persistencia import LECTORES, TAMANO_BLOQUE
+
+MAX_ERRORES = 100  # errores de validación que se guardan en el resumen
+
+
+def importar_archivo(archivo, formato, tamano_lote=TAMANO_BLOQUE, inventario=None):
+    if formato not in LECTORES:
+        raise ValueError(f'Formato no soportado: {formato}')
+    return importar_productos(LECTORES[formato](archivo), tamano_lote, inventario)
+
+
+def importar_productos(filas, tamano_lote=TAMANO_BLOQUE, inventario=None):
+    """
+    Valida cada fila como ProductoForm y hace upsert por nombre en lotes
+    (una transacción por lote). Como en Inventario, los nombres no distinguen
+    mayúsculas: 'pan' actualiza el 'Pan' que ya existe en vez de crear otro.
+    Devuelve un resumen con los contadores.
+    """
+    resumen = {'insertados': 0, 'actualizados': 0, 'rechazados': 0, 'errores': []}
+    lote = {}  # nombre en minúsculas -> fila; si un nombre se repite en el lote gana la última
+    for n, fila in enumerate(filas, 1):
+        datos, error = validar_producto(fila)
+        if error:
+            resumen['rechazados'] += 1
+            if len(resumen['errores']) < MAX_ERRORES:
+                resumen['errores'].append((n, error))
+            continue
+        lote[datos['nombre'].lower()] = datos
+        if len(lote) >= tamano_lote:
+            _guardar_lote(lote, resumen)
+            lote = {}
+    if lote:
+        _guardar_lote(lote, resumen)
+    if inventario is not None:
+        # solo recarga los productos registrados en cambios_productos
+        inventario.sincronizar(forzar=True)
+    return resumen
+
+
+def _sentencia_upsert():
+    tabla = Producto.__table__
+    dialecto = db.engine.dialect.name
+    if dialecto == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as insert_mysql
+        stmt = insert_mysql(tabla)
+        return stmt.on_duplicate_key_update(cantidad=stmt.inserted.cantidad, precio=stmt.inserted.precio)
+    if dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+    elif dialecto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+    else:
+        raise RuntimeError(f'Upsert no soportado para {dialecto}')
+    stmt = insert_dialecto(tabla)
+    return stmt.on_conflict_do_update(
+        index_elements=['nombre'],
+        set_={'cantidad': stmt.excluded.cantidad, 'precio': stmt.excluded.precio}
+    )
+
+
+def _nombre_sin_mayusculas():
+    # MySQL ya compara sin distinguir mayúsculas (collation *_ci) y así usa el índice único;
+    # en SQLite/PostgreSQL lower(nombre) usa ix_productos_nombre_min
+    if db.engine.dialect.name == 'mysql':
+        return Producto.nombre
+    return func.lower(Producto.nombre)
+
+
+def _guardar_lote(lote, resumen):
+    claves = list(lote)
+    try:
+        existentes = {
+            nombre.lower(): pid for pid, nombre in db.session.execute(
+                select(Producto.id, Producto.nombre).where(_nombre_sin_mayusculas().in_(claves))
+            )
+        }
+        # los que ya existen se actualizan por id (conservan el nombre guardado);
+        # los nuevos van por el upsert, por si otro worker los insertó en el medio
+        filas = [{'id': existentes[c], 'cantidad': d['cantidad'], 'precio': d['precio']}
+                 for c, d in lote.items() if c in existentes]
+        nuevos = [d for c, d in lote.items() if c not in existentes]
+        if filas:
+            db.session.execute(update(Producto), filas)  # UPDATE por clave primaria, en lote
+        ids = list(existentes.values())
+        if nuevos:
+            db.session.execute(_sentencia_upsert(), nuevos)  # executemany
+            ids += db.session.scalars(
+                select(Producto.id).where(Producto.nombre.in_([d['nombre'] for d in nuevos]))
+            ).all()
+        registrar_cambios(ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    resumen['actualizados'] += len(filas)
+    resumen['insertados'] += len(nuevos)
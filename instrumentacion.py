@@ -0,0 +1,350 @@
+# Instrumentación: tiempo por petición, consultas SQL (eventos del motor SQLAlchemy),
+# pool de conexiones, render de plantillas, perfil por muestreo de peticiones lentas y /metrics
+# en formato de texto de Prometheus.
+# Las métricas son por proceso: cada worker de gunicorn expone las suyas.
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from flask import g, request, has_request_context, before_render_template, template_rendered, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+
+log = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.cuentas = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                break
+        self.suma += valor
+        self.total += 1
+
+
+class Registro:
+    """Contadores e histogramas con etiquetas, y 'fuentes' (funciones que devuelven un dict de valores)."""
+    def __init__(self):
+        self._histogramas = {}  # (nombre, etiquetas) -> Histograma
+        self._contadores = {}   # (nombre, etiquetas) -> número
+        self._fuentes = []      # (prefijo, función)
+        self._lock = threading.Lock()
+
+    def observar(self, nombre, valor, buckets=BUCKETS_SEGUNDOS, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            h = self._histogramas.get(clave)
+            if h is None:
+                h = self._histogramas[clave] = Histograma(buckets)
+            h.observar(valor)
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def registrar_fuente(self, prefijo, funcion):
+        self._fuentes.append((prefijo, funcion))
+
+    def exportar(self):
+        lineas = []
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted(self._histogramas.items(), key=lambda x: x[0])
+            histogramas = [(k, h.buckets, list(h.cuentas), h.suma, h.total) for k, h in histogramas]
+        tipo = None
+        for (nombre, etiquetas), valor in contadores:
+            if nombre != tipo:
+                lineas.append(f'# TYPE {nombre} counter')
+                tipo = nombre
+            lineas.append(f'{nombre}{_etiquetas(etiquetas)} {valor}')
+        for (nombre, etiquetas), buckets, cuentas, suma, total in histogramas:
+            if nombre != tipo:
+                lineas.append(f'# TYPE {nombre} histogram')
+                tipo = nombre
+            acumulado = 0
+            for limite, n in zip(buckets, cuentas):
+                acumulado += n
+                lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas + (("le", limite),))} {acumulado}')
+            lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas + (("le", "+Inf"),))} {total}')
+            lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {suma:.6f}')
+            lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {total}')
+        for prefijo, funcion in self._fuentes:
+            try:
+                valores = funcion()
+            except Exception:
+                log.exception("Fuente de métricas '%s' falló.", prefijo)
+                continue
+            for clave, valor in valores.items():
+                if isinstance(valor, (int, float)):
+                    lineas.append(f'# TYPE {prefijo}_{clave} gauge')
+                    lineas.append(f'{prefijo}_{clave} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+
+def _etiquetas(pares):
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in pares) + '}'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registro = Registro()
+
+
+# --- Consultas SQL ---
+
+def anotar_consulta(motor, sentencia, duracion):
+    registro.observar('sql_consulta_segundos', duracion, motor=motor)
+    if has_request_context():
+        medicion = g.get('_medicion')
+        if medicion is not None:
+            medicion['consultas'] += 1
+            medicion['tiempo_sql'] += duracion
+            medicion['sentencias'][sentencia] += 1
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_de_ejecutar(conn, cursor, sentencia, parametros, contexto, executemany):
+    conn.info.setdefault('_inicio_consulta', []).append(time.perf_counter())
+    if contexto is not None:
+        contexto._inicio_anotado = True
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _despues_de_ejecutar(conn, cursor, sentencia, parametros, contexto, executemany):
+    inicio = conn.info['_inicio_consulta'].pop()
+    if contexto is not None:
+        contexto._inicio_anotado = False  # un error al leer las filas ya no tiene qué sacar
+    anotar_consulta('sqlalchemy', sentencia, time.perf_counter() - inicio)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _error_al_ejecutar(contexto):
+    # una sentencia que falla no llega a after_cursor_execute: su inicio se saca acá para
+    # que no se acumulen en conn.info (vive con la conexión del pool, no con la petición)
+    if getattr(contexto.execution_context, '_inicio_anotado', False):
+        contexto.connection.info['_inicio_consulta'].pop()
+
+
+# --- Pool de conexiones ---
+
+class MetricasPool:
+    """
+    Aciertos (se entregó una conexión ya abierta), fallos (hubo que abrir una nueva),
+    descartadas (rotas o recicladas) y espera por una conexión libre, del proceso.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entregas = 0
+        self.nuevas = 0
+        self.descartadas = 0
+        self.esperas = 0
+        self.tiempo_espera = 0.0
+
+    def anotar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def esperar(self, segundos):
+        with self._lock:
+            self.tiempo_espera += segundos
+            if segundos >= 0.001:  # por debajo es el costo de tomarla de la cola, no una espera
+                self.esperas += 1
+
+    def metricas(self):
+        with self._lock:
+            return {
+                'aciertos': max(0, self.entregas - self.nuevas),
+                'fallos': self.nuevas,
+                'descartadas': self.descartadas,
+                'esperas': self.esperas,
+                'tiempo_espera_s': round(self.tiempo_espera, 6),
+            }
+
+
+metricas_pool = MetricasPool()
+_pool_local = threading.local()
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que además mide cuánto se espera a que se libere una conexión."""
+    def _do_get(self):
+        if getattr(_pool_local, 'midiendo', False):  # QueuePool se llama a sí mismo al reintentar
+            return super()._do_get()
+        _pool_local.midiendo, _pool_local.conectando = True, 0.0
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _pool_local.midiendo = False
+            # abrir una conexión nueva no es espera: eso ya cuenta como fallo
+            metricas_pool.esperar(time.perf_counter() - inicio - _pool_local.conectando)
+
+    def _create_connection(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            _pool_local.conectando = getattr(_pool_local, 'conectando', 0.0) + time.perf_counter() - inicio
+
+
+@event.listens_for(Pool, 'checkout')
+def _conexion_entregada(conexion_dbapi, registro_conexion, proxy):
+    metricas_pool.anotar('entregas')
+
+
+@event.listens_for(Pool, 'connect')
+def _conexion_nueva(conexion_dbapi, registro_conexion):
+    metricas_pool.anotar('nuevas')
+
+
+@event.listens_for(Pool, 'invalidate')
+def _conexion_descartada(conexion_dbapi, registro_conexion, excepcion):
+    metricas_pool.anotar('descartadas')
+
+
+# --- Perfil por muestreo ---
+
+class Muestreador:
+    """
+    Un hilo que cada 'intervalo' segundos toma la pila de los hilos con una petición
+    en curso. Al terminar una petición lenta se escriben sus pilas en formato
+    'collapsed' (una línea 'a;b;c N', apto para flamegraph.pl / speedscope).
+    """
+    def __init__(self, intervalo=0.005, profundidad=40):
+        self.intervalo = intervalo
+        self.profundidad = profundidad
+        self._activos = {}  # id de hilo -> Counter de pilas
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def empezar(self):
+        tid = threading.get_ident()
+        with self._lock:
+            self._activos[tid] = Counter()
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._muestrear, name='muestreador', daemon=True)
+                self._hilo.start()
+
+    def terminar(self):
+        with self._lock:
+            return self._activos.pop(threading.get_ident(), None)
+
+    def _muestrear(self):
+        while True:
+            time.sleep(self.intervalo)
+            with self._lock:
+                activos = dict(self._activos)
+            if not activos:
+                continue
+            for tid, frame in sys._current_frames().items():
+                pilas = activos.get(tid)
+                if pilas is None:
+                    continue
+                pila = []
+                while frame is not None and len(pila) < self.profundidad:
+                    codigo = frame.f_code
+                    pila.append(f'{os.path.basename(codigo.co_filename)}:{codigo.co_name}:{frame.f_lineno}')
+                    frame = frame.f_back
+                pilas[';'.join(reversed(pila))] += 1
+
+
+def _guardar_perfil(carpeta, endpoint, duracion, pilas):
+    os.makedirs(carpeta, exist_ok=True)
+    nombre = f'{time.strftime("%Y%m%d-%H%M%S")}-{endpoint or "sin-endpoint"}-{int(duracion * 1000)}ms.txt'
+    ruta = os.path.join(carpeta, nombre)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        for pila, n in pilas.most_common():
+            f.write(f'{pila} {n}\n')
+    return ruta
+
+
+# --- Integración con Flask ---
+
+def init_app(app):
+    """
+    Configuración:
+    - INSTRUMENTACION_N1_UMBRAL: ejecuciones de la misma sentencia en una petición
+      a partir de las cuales se avisa de un posible N+1.
+    - PERFIL_UMBRAL: segundos; las peticiones más lentas guardan su perfil (0 = apagado).
+    - PERFIL_INTERVALO, PERFIL_DIR: intervalo de muestreo y carpeta de salida.
+    """
+    umbral_n1 = app.config.get('INSTRUMENTACION_N1_UMBRAL', 10)
+    umbral_perfil = app.config.get('PERFIL_UMBRAL', 0)
+    carpeta_perfil = app.config.get('PERFIL_DIR') or os.path.join(app.instance_path, 'perfiles')
+    muestreador = Muestreador(app.config.get('PERFIL_INTERVALO', 0.005)) if umbral_perfil else None
+
+    @app.before_request
+    def _empezar_medicion():
+        g._medicion = {'inicio': time.perf_counter(), 'consultas': 0, 'tiempo_sql': 0.0,
+                       'plantillas': 0.0, 'sentencias': Counter()}
+        if muestreador is not None:
+            muestreador.empezar()
+
+    @app.after_request
+    def _terminar_medicion(respuesta):
+        medicion = g.pop('_medicion', None)
+        if medicion is None:
+            return respuesta
+        duracion = time.perf_counter() - medicion['inicio']
+        ruta = request.url_rule.rule if request.url_rule else 'sin-ruta'
+        registro.observar('http_peticion_segundos', duracion,
+                          ruta=ruta, metodo=request.method, estado=respuesta.status_code)
+        registro.observar('http_consultas_por_peticion', medicion['consultas'], BUCKETS_CONSULTAS, ruta=ruta)
+        for sentencia, n in medicion['sentencias'].items():
+            if n >= umbral_n1:
+                registro.incrementar('sql_posible_n_mas_1_total', ruta=ruta)
+                log.warning("Posible N+1 en %s: %d ejecuciones de %s", ruta, n, ' '.join(sentencia.split())[:200])
+        respuesta.headers['Server-Timing'] = (
+            f'app;dur={duracion * 1000:.1f}, '
+            f'sql;dur={medicion["tiempo_sql"] * 1000:.1f};desc="{medicion["consultas"]} consultas", '
+            f'plantillas;dur={medicion["plantillas"] * 1000:.1f}'
+        )
+        if muestreador is not None:
+            pilas = muestreador.terminar()
+            if pilas and duracion >= umbral_perfil:
+                ruta_perfil = _guardar_perfil(carpeta_perfil, request.endpoint, duracion, pilas)
+                log.info("Petición lenta (%.3fs) en %s, perfil en %s", duracion, ruta, ruta_perfil)
+        return respuesta
+
+    if muestreador is not None:
+        @app.teardown_request
+        def _soltar_muestreo(exc):
+            muestreador.terminar()  # por si la vista lanzó una excepción
+
+    @before_render_template.connect_via(app)
+    def _antes_de_render(sender, template, context, **extra):
+        if has_request_context():
+            g.setdefault('_inicio_plantillas', []).append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def _despues_de_render(sender, template, context, **extra):
+        inicios = g.get('_inicio_plantillas') if has_request_context() else None
+        if not inicios:
+            return
+        duracion = time.perf_counter() - inicios.pop()
+        registro.observar('plantilla_render_segundos', duracion, plantilla=template.name)
+        medicion = g.get('_medicion')
+        if medicion is not None:
+            medicion['plantillas'] += duracion
+
+    @app.route('/metrics')
+    def metricas():
+        return Response(registro.exportar(), mimetype='text/plain; version=0.0.4')
@@ -1,67 +1,549 @@
-from modelos import db, Producto
+import os
+import time
+import heapq
+import atexit
+import logging
+import threading
+from array import array
+from bisect import bisect_right, insort
+from collections import namedtuple, defaultdict
+from itertools import chain, islice
+from sqlalchemy import bindparam, func, select, update, delete
+from sqlalchemy.orm.exc import StaleDataError
+from modelos import db, Producto, CambioProducto, registrar_cambios
+from persistencia import SnapshotCatalogo, SnapshotInvalido
+
+log = logging.getLogger(__name__)
+
+COLUMNAS = (Producto.id, Producto.nombre, Producto.cantidad, Producto.precio)
+
+
+class ProductoLigero(namedtuple('ProductoLigero', 'id nombre cantidad precio')):
+    """
+    Copia de solo lectura de un Producto para el cache: una tupla de 4 campos,
+    sin estado ORM ni sesión (no hay DetachedInstanceError ni identity map).
+    Tiene los mismos atributos que Producto, así que sirve igual en plantillas y formularios.
+    """
+    __slots__ = ()
+
+    def to_tuple(self):
+        return tuple(self)
+
 
 class Inventario:
     """
-    - Usa un diccionario {id: Producto} para accesos O(1).
-    - Mantiene un set con nombres en minúsculas para validar duplicados rápidamente.
-    - Devuelve listas ordenadas usando list/tuplas según convenga.
+    - Usa un diccionario {id: ProductoLigero} para accesos O(1).
+    - Mantiene un dict {nombre en minúsculas: id} para validar duplicados rápidamente.
+    - Mantiene una lista ordenada de nombres (bisect) para listar por páginas y un índice
+      de trigramas {trigrama: array de ids} que se arma en la primera búsqueda.
+    - Cada escritura deja una fila en 'cambios_productos'; los demás workers
+      comparan su versión con ese registro y recargan solo los productos cambiados.
     """
-    def __init__(self, productos_dict=None):
-        self.productos = productos_dict or {}  # dict[int, Producto]
-        self.nombres = set(p.nombre.lower() for p in self.productos.values())
+    # cambios por debajo de la versión que se vuelven a revisar en cada sincronización
+    VENTANA_CAMBIOS = 256
+    # productos agregados o renombrados desde que se armó el índice de trigramas (en
+    # proporción al catálogo) a partir de los cuales la próxima búsqueda lo vuelve a armar
+    REINDEXAR_FRACCION = 0.1
+    # si el trigrama menos frecuente de la búsqueda está en más de esta fracción del
+    # catálogo, recorrer los nombres en orden llena la página antes que filtrar candidatos
+    BUSQUEDA_DENSA = 0.25
+
+    def __init__(self, productos_dict=None, version=0, ttl=2.0, max_cambios=10000, snapshot=None):
+        self.productos = productos_dict or {}  # dict[int, ProductoLigero]
+        self.nombres = {}     # dict[str, int]: nombre en minúsculas -> id
+        self._claves = {}     # dict[int, str]: id -> nombre indexado
+        for p in self.productos.values():
+            clave = _clave(p.nombre)
+            self.nombres[clave] = p.id
+            self._claves[p.id] = clave
+        self._orden = sorted(self.nombres)  # list[str]: nombres en minúsculas, ordenados
+        # dict[str, array[int]] o None si no se armó; los ids borrados o renombrados después
+        # quedan en el índice y se descartan al comparar con _claves en cada búsqueda
+        self._trigramas = None
+        self._sucios = set()  # ids agregados o renombrados desde que se armó el índice
+        # con workers gthread/gevent varias peticiones comparten esta instancia:
+        # los índices se modifican con el candado tomado y sin E/S de por medio
+        self._lock = threading.RLock()
+        self.version = version          # último cambio aplicado
+        self._vistos = set()            # ids aplicados dentro de la ventana (ver sincronizar)
+        self.tardios = 0                # cambios aplicados por debajo de la versión (no se reinicia)
+        self.ttl = ttl                  # segundos entre revisiones del registro
+        self.max_cambios = max_cambios  # tamaño máximo del registro antes de purgar
+        self.snapshot = snapshot        # snapshot binario para calentar sin leer la tabla
+        self._ultima_sync = time.monotonic()
+        self._cargado = True
+        # escritura diferida (ver activar_escritura_diferida): cambios aún no guardados
+        self._app = None
+        self._pendientes = {}  # dict[int, dict]: id -> {campo: valor}
+        self._enviando = {}    # lo que se está guardando en este momento
+        self._lock_pendientes = threading.Lock()
+        self._hay_pendientes = threading.Event()
+        self._escritor_pid = None
 
     @classmethod
-    def cargar_desde_bd(cls):
-        productos = Producto.query.all()              # -> list[Producto]
-        productos_dict = {p.id: p for p in productos} # dict por id
-        return cls(productos_dict)
+    def perezoso(cls, ttl=2.0, max_cambios=10000, snapshot=None):
+        """Inventario vacío que se carga en el primer uso (o al llamar a calentar())."""
+        inventario = cls(ttl=ttl, max_cambios=max_cambios, snapshot=snapshot)
+        inventario._cargado = False
+        return inventario
 
-    # --- CRUD ---
-    def agregar(self, nombre: str, cantidad: int, precio: float) -> Producto:
-        if nombre.lower() in self.nombres:
-            raise ValueError('Ya existe un producto con ese nombre.')
-        p = Producto(nombre=nombre.strip(), cantidad=int(cantidad), precio=float(precio))
-        db.session.add(p)
-        db.session.commit()
-        self.productos[p.id] = p
-        self.nombres.add(p.nombre.lower())
-        return p
+    @classmethod
+    def cargar(cls, ttl=2.0, max_cambios=10000, snapshot=None):
+        """Desde el snapshot si hay uno válido; si no, desde la BD."""
+        if snapshot and os.path.exists(snapshot):
+            try:
+                return cls.cargar_desde_snapshot(snapshot, ttl, max_cambios)
+            except (OSError, SnapshotInvalido) as e:
+                log.warning("Snapshot %s descartado (%s); se carga desde la BD.", snapshot, e)
+        inventario = cls.cargar_desde_bd(ttl, max_cambios)
+        inventario.snapshot = snapshot
+        return inventario
 
-    def eliminar(self, id: int) -> bool:
-        p = self.productos.get(id) or Producto.query.get(id)
-        if not p:
+    @classmethod
+    def cargar_desde_snapshot(cls, archivo, ttl=2.0, max_cambios=10000):
+        # los productos salen del archivo; lo cambiado después de su revisión lo trae
+        # la siguiente sincronización desde el registro de cambios
+        with SnapshotCatalogo(archivo) as snap:
+            ultimo = db.session.query(func.max(CambioProducto.id)).scalar() or 0
+            if snap.revision > ultimo:
+                raise SnapshotInvalido(f'revisión {snap.revision} posterior a la BD ({ultimo})')
+            productos_dict = {f[0]: ProductoLigero(*f) for f in snap}
+            version = snap.revision
+        return cls(productos_dict, version=version, ttl=ttl, max_cambios=max_cambios, snapshot=archivo)
+
+    @classmethod
+    def cargar_desde_bd(cls, ttl=2.0, max_cambios=10000):
+        # la versión se lee antes que los productos: si algo cambia en medio
+        # se vuelve a aplicar en la siguiente sincronización (es idempotente)
+        version = db.session.query(func.max(CambioProducto.id)).scalar() or 0
+        vistos = set(db.session.scalars(
+            select(CambioProducto.id).where(CambioProducto.id > version - cls.VENTANA_CAMBIOS)
+        ))
+        # solo columnas: no se construyen objetos ORM que luego habría que descartar
+        filas = db.session.execute(select(*COLUMNAS).execution_options(yield_per=5000))
+        productos_dict = {f[0]: ProductoLigero(*f) for f in filas}
+        inventario = cls(productos_dict, version=version, ttl=ttl, max_cambios=max_cambios)
+        inventario._vistos = vistos
+        return inventario
+
+    def calentar(self) -> bool:
+        """Carga el catálogo si aún no está cargado; las peticiones que llegan mientras tanto esperan."""
+        if self._cargado:
             return False
-        db.session.delete(p)
-        db.session.commit()
-        self.productos.pop(id, None)
-        self.nombres.discard(p.nombre.lower())
+        with self._lock:
+            if self._cargado:
+                return False
+            inicio = time.monotonic()
+            self._reemplazar(Inventario.cargar(self.ttl, self.max_cambios, self.snapshot))
+            log.info("Inventario cargado: %d productos en %.2fs", len(self.productos), time.monotonic() - inicio)
+        self.sincronizar(forzar=True)  # cambios posteriores al snapshot
         return True
 
-    def actualizar(self, id: int, nombre=None, cantidad=None, precio=None) -> Producto | None:
-        p = self.productos.get(id) or Producto.query.get(id)
-        if not p:
-            return None
-        if nombre is not None:
-            nuevo = nombre.strip()
-            if nuevo.lower() != p.nombre.lower() and nuevo.lower() in self.nombres:
-                raise ValueError('Ya existe otro producto con ese nombre.')
-            self.nombres.discard(p.nombre.lower())
-            p.nombre = nuevo
-            self.nombres.add(p.nombre.lower())
-        if cantidad is not None:
-            p.cantidad = int(cantidad)
-        if precio is not None:
-            p.precio = float(precio)
+    # lo que se copia en una recarga completa; candados y cambios pendientes se conservan
+    _CAMPOS_CARGA = ('productos', 'nombres', '_claves', '_trigramas', '_sucios', '_orden', 'version', '_vistos',
+                     '_cargado')
+
+    def _reemplazar(self, nuevo):
+        for campo in self._CAMPOS_CARGA:
+            setattr(self, campo, getattr(nuevo, campo))
+        for pid in list(self._pendientes) + list(self._enviando):
+            if pid in self.productos:
+                self.productos[pid] = self._con_pendientes(self.productos[pid])
+
+    def contar(self) -> int:
+        self.sincronizar()
+        return len(self.productos)
+
+    # --- Registro de cambios ---
+    @staticmethod
+    def registrar_cambio(producto_id: int):
+        # se agrega a la sesión actual; lo confirma el commit de quien llama
+        registrar_cambios([producto_id])
+
+    def notificar_cambios(self, ids):
+        # para escrituras hechas fuera de Inventario (p. ej. compras con SQL directo)
+        registrar_cambios(ids)
         db.session.commit()
-        self.productos[p.id] = p
+        self.sincronizar(forzar=True)
+
+    def sincronizar(self, forzar=False) -> int:
+        """Aplica los cambios hechos por otros workers. Devuelve cuántos productos recargó."""
+        if not self._cargado:
+            return len(self.productos) if self.calentar() else 0
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultima_sync < self.ttl:
+            return 0
+        # si otro hilo ya está sincronizando se sigue con el estado actual
+        if not self._lock.acquire(blocking=forzar):
+            return 0
+        try:
+            self._ultima_sync = ahora
+            minimo = db.session.query(func.min(CambioProducto.id)).scalar()
+            if minimo is not None and minimo > self.version + 1:
+                # el registro ya se purgó por encima de nuestra versión: recarga completa
+                self._reemplazar(Inventario.cargar_desde_bd(self.ttl, self.max_cambios))
+                return len(self.productos)
+
+            # con MySQL los ids se asignan al insertar pero se ven al confirmar: un id menor
+            # puede aparecer después de uno mayor. Se vuelve a leer una ventana por debajo
+            # de la versión y se aplican los ids que todavía no se habían visto
+            desde = self.version - self.VENTANA_CAMBIOS
+            filas = [(v, pid) for v, pid in
+                     db.session.query(CambioProducto.id, CambioProducto.producto_id)
+                     .filter(CambioProducto.id > desde).all()
+                     if v > self.version or v not in self._vistos]
+            if not filas:
+                return 0
+            lista = list({pid for _, pid in filas})
+            nuevos = self._leer(lista)
+            if self._pendientes or self._enviando:
+                # lo leído no incluye aún los cambios propios sin guardar
+                nuevos = [self._con_pendientes(p) for p in nuevos]
+            for pid in lista:
+                self.productos.pop(pid, None)
+                self._desindexar(pid)
+            for p in nuevos:
+                self.productos[p.id] = p
+                self._indexar(p.id, p.nombre)
+            self.tardios += sum(1 for v, _ in filas if v <= self.version)
+            self.version = max(self.version, max(v for v, _ in filas))
+            self._vistos.update(v for v, _ in filas)
+            desde = self.version - self.VENTANA_CAMBIOS
+            self._vistos = {v for v in self._vistos if v > desde}
+        finally:
+            self._lock.release()
+
+        if minimo is not None and self.version - minimo >= self.max_cambios:
+            self.purgar_cambios()
+        return len(lista)
+
+    @staticmethod
+    def _leer(ids) -> list:
+        nuevos = []
+        for i in range(0, len(ids), 500):
+            nuevos += [ProductoLigero(*f) for f in
+                       db.session.execute(select(*COLUMNAS).where(Producto.id.in_(ids[i:i + 500])))]
+        return nuevos
+
+    def obtener(self, id: int):
+        self.sincronizar()
+        return self.productos.get(id)
+
+    def version_catalogo(self) -> str:
+        # dos workers con la misma versión muestran el mismo catálogo; 'tardios' cambia
+        # la clave cuando llega un cambio con id menor a la versión ya aplicada
+        self.sincronizar()
+        return f'{self.version}.{self.tardios}'
+
+    def purgar_cambios(self):
+        # conserva solo los últimos 'max_cambios' registros
+        limite = self.version - self.max_cambios
+        if limite > 0:
+            CambioProducto.query.filter(CambioProducto.id <= limite).delete(synchronize_session=False)
+            db.session.commit()
+
+    # --- Índices ---
+    def _indexar(self, id: int, nombre: str):
+        clave = _clave(nombre)
+        self.nombres[clave] = id
+        self._claves[id] = clave
+        insort(self._orden, clave)
+        if self._trigramas is not None:
+            self._sucios.add(id)
+
+    def _desindexar(self, id: int):
+        clave = self._claves.pop(id, None)
+        if clave is None:
+            return
+        self.nombres.pop(clave, None)
+        i = bisect_right(self._orden, clave) - 1
+        if i >= 0 and self._orden[i] == clave:
+            del self._orden[i]
+
+    def _indice_trigramas(self):
+        # se llama con el candado tomado
+        if self._trigramas is None or len(self._sucios) > len(self.productos) * self.REINDEXAR_FRACCION:
+            indice = defaultdict(lambda: array('i'))
+            for id, clave in self._claves.items():
+                for t in _trigramas(clave):
+                    indice[t].append(id)
+            self._trigramas, self._sucios = dict(indice), set()
+        return self._trigramas
+
+    # --- CRUD ---
+    # Las escrituras van a la BD con INSERT/UPDATE/DELETE directos y el cache guarda
+    # solo registros ligeros: ningún objeto ORM sobrevive a la petición.
+    def agregar(self, nombre: str, cantidad: int, precio: float) -> ProductoLigero:
+        return self.agregar_varios([{'nombre': nombre, 'cantidad': cantidad, 'precio': precio}])[0]
+
+    def agregar_varios(self, datos) -> list:
+        """Crea varios productos en una sola transacción (todo o nada)."""
+        self.sincronizar()
+        nuevos = set()
+        for d in datos:
+            clave = d['nombre'].strip().lower()
+            if clave in self.nombres or clave in nuevos:
+                raise ValueError(f'Ya existe un producto con ese nombre: {d["nombre"].strip()}')
+            nuevos.add(clave)
+        productos = [Producto(nombre=d['nombre'].strip(), cantidad=int(d['cantidad']), precio=float(d['precio']))
+                     for d in datos]
+        try:
+            db.session.add_all(productos)
+            db.session.flush()  # para obtener los ids antes del commit
+            registrar_cambios(p.id for p in productos)
+            # se copia antes del commit: después los atributos quedan expirados
+            registros = [ProductoLigero(*p.to_tuple()) for p in productos]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        with self._lock:
+            for r in registros:
+                self.productos[r.id] = r
+                self._indexar(r.id, r.nombre)
+        self.sincronizar(forzar=True)  # deja 'version' al día con el cambio propio
+        return registros
+
+    def eliminar(self, id: int) -> bool:
+        return self.eliminar_varios([id]) == 1
+
+    def eliminar_varios(self, ids) -> int:
+        """Elimina en una sola transacción; devuelve cuántos existían."""
+        self.vaciar_pendientes()
+        ids = list(set(ids))
+        existentes = []
+        try:
+            for i in range(0, len(ids), 500):
+                existentes += db.session.scalars(select(Producto.id).where(Producto.id.in_(ids[i:i + 500]))).all()
+            if not existentes:
+                return 0
+            for i in range(0, len(existentes), 500):
+                db.session.execute(delete(Producto).where(Producto.id.in_(existentes[i:i + 500])))
+            registrar_cambios(existentes, eliminados=True)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        with self._lock:
+            for pid in existentes:
+                self.productos.pop(pid, None)
+                self._desindexar(pid)
+        self.sincronizar(forzar=True)
+        return len(existentes)
+
+    def actualizar_varios(self, cambios) -> list:
+        """cambios: lista de dicts con 'id' y los campos a modificar. Una sola transacción."""
+        self.vaciar_pendientes()  # que un cambio diferido más viejo no pise a estos
+        self.sincronizar()
+        faltan = [c['id'] for c in cambios if c['id'] not in self.productos]
+        actuales = {p.id: p for p in self._leer(faltan)} if faltan else {}
+        nombres = dict(self.nombres)  # copia para validar renombres cruzados dentro del lote
+        registros, filas = [], []
+        for c in cambios:
+            p = self.productos.get(c['id']) or actuales.get(c['id'])
+            if not p:
+                raise LookupError(f'No existe el producto {c["id"]}.')
+            valores = _valores(c)
+            if 'nombre' in valores:
+                clave = valores['nombre'].lower()
+                if nombres.get(clave, p.id) != p.id:
+                    raise ValueError(f'Ya existe otro producto con ese nombre: {valores["nombre"]}')
+                nombres.pop(p.nombre.lower(), None)
+                nombres[clave] = p.id
+            if valores:
+                filas.append({'id': p.id, **valores})
+            registros.append(p._replace(**valores))
+        try:
+            if filas:
+                db.session.execute(update(Producto), filas)  # UPDATE por clave primaria, en lote
+            registrar_cambios(r.id for r in registros)
+            db.session.commit()
+        except StaleDataError:
+            # otro worker borró alguno y este cache todavía lo tenía (hasta el próximo sincronizar)
+            db.session.rollback()
+            self.sincronizar(forzar=True)
+            borrados = [f['id'] for f in filas if f['id'] not in self.productos]
+            raise LookupError(f'No existe el producto {borrados[0] if borrados else filas[0]["id"]}.')
+        except Exception:
+            db.session.rollback()
+            raise
+        with self._lock:
+            for r in registros:
+                if self._claves.get(r.id) != _clave(r.nombre):
+                    self._desindexar(r.id)
+                    self._indexar(r.id, r.nombre)
+                self.productos[r.id] = r
+        self.sincronizar(forzar=True)
+        return registros
+
+    def actualizar(self, id: int, nombre=None, cantidad=None, precio=None) -> ProductoLigero | None:
+        if self._app is not None:
+            p = self.obtener(id)
+            # los renombres validan unicidad contra la BD: esos van siempre por el camino normal
+            if p is not None and (nombre is None or nombre.strip() == p.nombre):
+                return self._diferir(id, _valores({'cantidad': cantidad, 'precio': precio}))
+        try:
+            return self.actualizar_varios([{'id': id, 'nombre': nombre, 'cantidad': cantidad, 'precio': precio}])[0]
+        except LookupError:
+            return None
+
+    # --- Escritura diferida (opcional) ---
+    def activar_escritura_diferida(self, app, intervalo=0.2, max_pendientes=500):
+        """
+        Los cambios de cantidad/precio hechos con actualizar() se ven en el cache al instante
+        y se guardan agrupados: una transacción cada 'intervalo' segundos o al juntar
+        'max_pendientes' productos (el que llena la cola escribe). Al salir del proceso
+        se guarda lo pendiente; una caída abrupta pierde a lo sumo un intervalo de cambios.
+        """
+        self._app = app
+        self.intervalo_escritura = intervalo
+        self.max_pendientes = max_pendientes
+        atexit.register(self.vaciar_pendientes)
+
+    def _diferir(self, id, valores):
+        with self._lock:
+            p = self.productos.get(id)
+            if p is None:
+                return None
+            p = self.productos[id] = p._replace(**valores)
+        with self._lock_pendientes:
+            self._pendientes.setdefault(id, {}).update(valores)
+            lleno = len(self._pendientes) >= self.max_pendientes
+        if lleno:
+            self.vaciar_pendientes()
+        else:
+            self._asegurar_escritor()
+            self._hay_pendientes.set()
         return p
 
+    def _con_pendientes(self, p):
+        valores = {**self._enviando.get(p.id, {}), **self._pendientes.get(p.id, {})}
+        return p._replace(**valores) if valores else p
+
+    def _asegurar_escritor(self):
+        # el hilo no sobrevive a un fork: cada worker arranca el suyo
+        if self._escritor_pid != os.getpid():
+            self._escritor_pid = os.getpid()
+            threading.Thread(target=self._escribir_en_fondo, name='escritura-diferida', daemon=True).start()
+
+    def _escribir_en_fondo(self):
+        while True:
+            self._hay_pendientes.wait()
+            time.sleep(self.intervalo_escritura)  # junta lo que llegue en este intervalo
+            self._hay_pendientes.clear()
+            try:
+                self.vaciar_pendientes()
+            except Exception:
+                log.exception("No se pudieron guardar los cambios diferidos; se reintenta.")
+                self._hay_pendientes.set()
+
+    def vaciar_pendientes(self) -> int:
+        """Guarda en una sola transacción los cambios diferidos. Devuelve cuántos productos escribió."""
+        if self._app is None:
+            return 0
+        with self._lock_pendientes:
+            if not self._pendientes:
+                return 0
+            pendientes, self._pendientes = self._pendientes, {}
+            self._enviando = pendientes
+        # contexto propio: la sesión de la petición que llama no se confirma acá
+        with self._app.app_context():
+            try:
+                # UPDATE ... WHERE id = ? en executemany, uno por combinación de columnas;
+                # a diferencia del UPDATE por clave del ORM no falla si otro borró el producto
+                tabla = Producto.__table__
+                grupos = {}
+                for pid, valores in pendientes.items():
+                    grupos.setdefault(tuple(sorted(valores)), []).append({'_id': pid, **valores})
+                for filas in grupos.values():
+                    db.session.execute(update(tabla).where(tabla.c.id == bindparam('_id')), filas)
+                # solo los que el UPDATE encontró: si otro worker borró el producto mientras
+                # el cambio esperaba, registrarlo borraría la lápida que dejó el borrado
+                ids = sorted(pendientes)
+                existentes = []
+                for i in range(0, len(ids), 500):
+                    existentes += db.session.scalars(
+                        select(Producto.id).where(Producto.id.in_(ids[i:i + 500]))).all()
+                registrar_cambios(existentes)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with self._lock_pendientes:
+                    for pid, v in pendientes.items():
+                        self._pendientes[pid] = {**v, **self._pendientes.get(pid, {})}
+                raise
+            finally:
+                self._enviando = {}
+            self.sincronizar(forzar=True)
+        return len(existentes)
+
     # --- Consultas con colecciones ---
-    def buscar_por_nombre(self, q: str):
+    # limit/offset paginan; 'despues' es un cursor: el nombre (en minúsculas)
+    # del último producto de la página anterior.
+    def buscar_por_nombre(self, q: str, limit=None, offset=0, despues=None):
+        self.sincronizar()
         q = q.lower()
-        # list comprehension: filtra del dict de cache
-        return sorted([p for p in self.productos.values() if q in p.nombre.lower()],
-                      key=lambda x: x.nombre)
+        grams = _trigramas(q)
+        ids = ()
+        if grams:
+            with self._lock:
+                indice = self._indice_trigramas()
+                sucios = list(self._sucios)
+            vacio = array('i')
+            ids = min((indice.get(t, vacio) for t in grams), key=len)
+        if not grams or (limit is not None and len(ids) > len(self._orden) * self.BUSQUEDA_DENSA):
+            # consulta corta (< 3 letras) o que aparece en buena parte del catálogo:
+            # recorre el orden y corta al llenar la página
+            inicio = bisect_right(self._orden, despues) if despues else 0
+            claves = []
+            for clave in islice(self._orden, inicio, None):
+                if q in clave:
+                    if offset:
+                        offset -= 1
+                        continue
+                    claves.append(clave)
+                    if limit is not None and len(claves) >= limit:
+                        break
+            return [self.productos[self.nombres[c]] for c in claves]
+        # candidatos: la lista más corta de los trigramas de q y lo cambiado desde que se
+        # armó el índice; se confirma cada uno contra el nombre actual
+        claves = self._claves
+        encontrados = {k for k in (claves.get(i) for i in chain(ids, sucios)) if k is not None and q in k}
+        if despues:
+            encontrados = [k for k in encontrados if k > despues]
+        if limit is None:
+            pagina = sorted(encontrados)[offset:]
+        else:
+            # solo se ordena lo que entra en la página
+            pagina = heapq.nsmallest(offset + limit, encontrados)[offset:]
+        return [self.productos[self.nombres[c]] for c in pagina]
+
+    def listar_todos(self, limit=None, offset=0, despues=None):
+        self.sincronizar()
+        return self._pagina(self._orden, limit, offset, despues)
+
+    def _pagina(self, claves, limit, offset, despues):
+        inicio = (bisect_right(claves, despues) if despues else 0) + offset
+        fin = inicio + limit if limit is not None else None
+        return [self.productos[self.nombres[c]] for c in claves[inicio:fin]]
+
+
+def _clave(nombre: str) -> str:
+    # si el nombre ya está en minúsculas se reutiliza el mismo str (no se guarda dos veces)
+    clave = nombre.lower()
+    return nombre if clave == nombre else clave
+
+
+def _valores(cambio) -> dict:
+    valores = {}
+    if cambio.get('nombre') is not None:
+        valores['nombre'] = cambio['nombre'].strip()
+    if cambio.get('cantidad') is not None:
+        valores['cantidad'] = int(cambio['cantidad'])
+    if cambio.get('precio') is not None:
+        valores['precio'] = float(cambio['precio'])
+    return valores
+
 
-    def listar_todos(self):
-        return sorted(self.productos.values(), key=lambda x: x.nombre)
\ No newline at end of file
+def _trigramas(texto: str) -> set:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
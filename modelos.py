@@ -1,13 +1,41 @@
+import sqlite3
+from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, select, insert, update, delete, func, inspect, text
+from sqlalchemy.engine import Engine
 
 db = SQLAlchemy()
 
+# SQLite: con WAL los lectores no bloquean al escritor (ni al revés); synchronous=NORMAL
+# hace fsync solo en los checkpoints del WAL y busy_timeout espera el candado de escritura
+# en vez de fallar enseguida con "database is locked" cuando escriben varios workers.
+PRAGMAS_SQLITE = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16000',  # ~16 MB por conexión
+)
+
+
+@event.listens_for(Engine, 'connect')
+def _pragmas_sqlite(conexion_dbapi, registro):
+    if isinstance(conexion_dbapi, sqlite3.Connection):
+        cursor = conexion_dbapi.cursor()
+        for pragma in PRAGMAS_SQLITE:
+            cursor.execute(pragma)
+        cursor.close()
+
+
 class Producto(db.Model):
     __tablename__ = 'productos'
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(120), unique=True, nullable=False)
     cantidad = db.Column(db.Integer, nullable=False, default=0)
     precio = db.Column(db.Float, nullable=False, default=0.0)  # para demo
+    # id del último cambio en 'cambios_productos': las exportaciones incrementales
+    # piden las filas con revision > la última exportada
+    revision = db.Column(db.Integer, nullable=False, default=0, index=True)
 
     def __repr__(self):
         return f'<Producto {self.id} {self.nombre}>'
@@ -19,6 +47,8 @@ class Producto(db.Model):
 # modelos para clientes.
 class Cliente(db.Model):
     __tablename__ = 'clientes'
+    # índice para ordenar/paginar por (nombre, id) sin recorrer toda la tabla
+    __table_args__ = (db.Index('ix_clientes_nombre_id', 'nombre', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(120), nullable=False)
     direccion = db.Column(db.String(200), nullable=False)
@@ -29,4 +59,173 @@ class Cliente(db.Model):
 
     def to_tuple(self):
         # ejemplo de tupla: (id, nombre, direccion, correo_electronico)
-        return (self.id, self.nombre, self.direccion, self.correo_electronico) 
\ No newline at end of file
+        return (self.id, self.nombre, self.direccion, self.correo_electronico)
+
+
+# registro de cambios de productos (compartido entre workers).
+# El id autoincremental funciona como versión global del catálogo.
+class CambioProducto(db.Model):
+    __tablename__ = 'cambios_productos'
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, nullable=False, index=True)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CambioProducto v{self.id} producto={self.producto_id}>'
+
+
+# lápidas: productos borrados y la revisión del borrado, para las exportaciones incrementales
+class ProductoEliminado(db.Model):
+    __tablename__ = 'productos_eliminados'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    revision = db.Column(db.Integer, nullable=False, index=True)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ProductoEliminado {self.id} v{self.revision}>'
+
+
+def registrar_cambios(ids, eliminados=False):
+    """
+    Anota los productos en 'cambios_productos' y copia la revisión del cambio a cada
+    producto (o a su lápida si se borró). Va en la sesión actual: lo confirma el commit
+    de quien llama, junto con la escritura del producto.
+    """
+    ids = sorted(set(ids))
+    if not ids:
+        return
+    db.session.execute(insert(CambioProducto), [{'producto_id': pid} for pid in ids])
+    ultimo = (select(func.max(CambioProducto.id))
+              .where(CambioProducto.producto_id == Producto.id)
+              .scalar_subquery())
+    for i in range(0, len(ids), 500):
+        lote = ids[i:i + 500]
+        if eliminados:
+            # la lápida de un borrado anterior del mismo id se reemplaza
+            db.session.execute(delete(ProductoEliminado).where(ProductoEliminado.id.in_(lote)))
+            db.session.execute(insert(ProductoEliminado).from_select(
+                ['id', 'revision'],
+                select(CambioProducto.producto_id, func.max(CambioProducto.id))
+                .where(CambioProducto.producto_id.in_(lote))
+                .group_by(CambioProducto.producto_id)
+            ))
+        else:
+            # un id reutilizado (SQLite sin AUTOINCREMENT) deja de ser lápida; solo si el
+            # producto existe: un cambio tardío sobre uno ya borrado no borra su lápida
+            db.session.execute(delete(ProductoEliminado).where(
+                ProductoEliminado.id.in_(lote),
+                ProductoEliminado.id.in_(select(Producto.id).where(Producto.id.in_(lote))),
+            ))
+            db.session.execute(update(Producto).where(Producto.id.in_(lote)).values(revision=ultimo)
+                               .execution_options(synchronize_session=False))
+
+
+
+# carritos de compra guardados en el servidor (la cookie solo lleva el id)
+class Carrito(db.Model):
+    __tablename__ = 'carritos'
+    id = db.Column(db.String(32), primary_key=True)
+    actualizado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class CarritoLinea(db.Model):
+    __tablename__ = 'carrito_lineas'
+    carrito_id = db.Column(db.String(32), db.ForeignKey('carritos.id', ondelete='CASCADE'), primary_key=True)
+    producto_id = db.Column(db.Integer, primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<CarritoLinea {self.carrito_id} producto={self.producto_id} x{self.cantidad}>'
+
+
+# usuarios de la tienda (login). La clase para Flask-Login es conexion.models.user.Usuario;
+# esta es solo la tabla.
+class UsuarioBD(db.Model):
+    __tablename__ = 'usuarios'
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password = db.Column(db.String(255), nullable=False)
+    rol = db.Column(db.String(20), nullable=False, default='user')
+    # sube con cada cambio de rol o contraseña: los caches de usuarios de los workers la comparan
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<UsuarioBD {self.id} {self.email}>'
+
+
+class Compra(db.Model):
+    __tablename__ = 'compras'
+    # historial de compras por usuario, paginado por (fecha, id) descendente
+    __table_args__ = (db.Index('ix_compras_usuario_fecha_id', 'usuario_id', 'fecha', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, nullable=False)
+    producto_id = db.Column(db.Integer, nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Compra {self.id} usuario={self.usuario_id} producto={self.producto_id} x{self.cantidad}>'
+
+
+# contadores del dashboard, repartidos en varios 'slot' para que compras
+# concurrentes no bloqueen siempre la misma fila (el total es la suma)
+class ResumenTienda(db.Model):
+    __tablename__ = 'resumen_tienda'
+    clave = db.Column(db.String(40), primary_key=True)
+    slot = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    valor = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+
+
+# trabajos en segundo plano (ver trabajos.py). 'clave_activa' repite la clave de
+# deduplicación mientras el trabajo está pendiente o en curso: el índice único impide
+# encolar dos veces lo mismo aunque lo pidan dos workers a la vez.
+class Trabajo(db.Model):
+    __tablename__ = 'trabajos'
+    __table_args__ = (db.Index('ix_trabajos_estado_id', 'estado', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(40), nullable=False)
+    parametros = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    clave = db.Column(db.String(255), nullable=False)
+    clave_activa = db.Column(db.String(255), unique=True)
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')
+    progreso = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    cancelar = db.Column(db.Boolean, nullable=False, default=False)
+    resultado = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    worker = db.Column(db.String(120))
+    creado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    iniciado = db.Column(db.DateTime)
+    latido = db.Column(db.DateTime)
+    terminado = db.Column(db.DateTime, index=True)
+
+    def __repr__(self):
+        return f'<Trabajo {self.id} {self.tipo} {self.estado}>'
+
+
+COLUMNAS_NUEVAS = (
+    ('productos', 'revision', 'INTEGER NOT NULL DEFAULT 0'),
+    ('usuarios', 'version', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+
+def agregar_columnas():
+    # create_all tampoco agrega columnas nuevas a tablas existentes
+    inspector = inspect(db.engine)
+    for tabla, columna, tipo in COLUMNAS_NUEVAS:
+        if columna not in {c['name'] for c in inspector.get_columns(tabla)}:
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {tabla} ADD COLUMN {columna} {tipo}'))
+
+
+def crear_indices():
+    # create_all no agrega índices nuevos a tablas que ya existen
+    for tabla in db.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            indice.create(db.engine, checkfirst=True)
+    if db.engine.dialect.name in ('sqlite', 'postgresql'):
+        # nombres sin distinguir mayúsculas (importación); MySQL ya compara así con su
+        # collation por defecto. Va aparte: la reflexión no ve índices por expresión
+        with db.engine.begin() as conn:
+            conn.execute(text('CREATE INDEX IF NOT EXISTS ix_productos_nombre_min ON productos (lower(nombre))'))
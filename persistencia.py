@@ -1,6 +1,24 @@
 import os
+import io
+import sys
 import json
 import csv
+import mmap
+import zlib
+import shutil
+import struct
+import hashlib
+import tempfile
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func
+from modelos import db, Producto, CambioProducto, ProductoEliminado
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos para las exportaciones incrementales
+    fcntl = None
 
 # Obtener la ruta absoluta de la carpeta 'instance'
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -13,13 +31,473 @@ os.makedirs(INSTANCE_FOLDER, exist_ok=True)
 TXT_FILE = os.path.join(INSTANCE_FOLDER, 'productos.txt')
 JSON_FILE = os.path.join(INSTANCE_FOLDER, 'productos.json')
 CSV_FILE = os.path.join(INSTANCE_FOLDER, 'productos.csv')
+NDJSON_FILE = os.path.join(INSTANCE_FOLDER, 'productos.ndjson')
+SNAPSHOT_FILE = os.path.join(INSTANCE_FOLDER, 'productos.snap')
+DELTAS_DIR = os.path.join(INSTANCE_FOLDER, 'deltas')
+MANIFIESTO = 'manifiesto.json'
+
+CAMPOS = ('id', 'nombre', 'cantidad', 'precio')
+TAMANO_BLOQUE = 1000  # filas por bloque escrito / leído de la BD
+
+
+# --- Exportación por streaming ---
+# Las filas son tuplas (id, nombre, cantidad, precio); los generadores devuelven
+# bloques de texto de TAMANO_BLOQUE filas, así la memoria no crece con el catálogo.
+
+def filas_productos(tamano_lote=TAMANO_BLOQUE):
+    # yield_per: el cursor trae las filas por lotes, sin crear objetos Producto
+    consulta = (select(Producto.id, Producto.nombre, Producto.cantidad, Producto.precio)
+                .order_by(Producto.id)
+                .execution_options(yield_per=tamano_lote))
+    for fila in db.session.execute(consulta):
+        yield tuple(fila)
+
+
+def _en_bloques(filas, formatear, tamano=TAMANO_BLOQUE):
+    bloque = []
+    for fila in filas:
+        bloque.append(formatear(fila))
+        if len(bloque) >= tamano:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+def generar_txt(filas):
+    return _en_bloques(filas, lambda f: f"{f[0]},{f[1]},{f[2]},{f[3]}\n")
+
+
+def generar_ndjson(filas):
+    return _en_bloques(filas, lambda f: json.dumps(dict(zip(CAMPOS, f)), ensure_ascii=False) + '\n')
+
+
+def generar_json(filas):
+    # arreglo JSON escrito de a poco: un objeto por línea
+    separador = ''
+
+    def formatear(f):
+        nonlocal separador
+        texto = separador + '    ' + json.dumps(dict(zip(CAMPOS, f)), ensure_ascii=False)
+        separador = ',\n'
+        return texto
+
+    yield '[\n'
+    yield from _en_bloques(filas, formatear)
+    yield '\n]\n'
+
+
+def generar_csv(filas):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CAMPOS)
+    n = 0
+    for fila in filas:
+        writer.writerow(fila)
+        n += 1
+        if n >= TAMANO_BLOQUE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            n = 0
+    yield buffer.getvalue()
+
+
+GENERADORES = {
+    'txt': generar_txt,
+    'json': generar_json,
+    'ndjson': generar_ndjson,
+    'csv': generar_csv,
+}
+ARCHIVOS = {'txt': TXT_FILE, 'json': JSON_FILE, 'ndjson': NDJSON_FILE, 'csv': CSV_FILE}
+TIPOS_MIME = {
+    'txt': 'text/plain',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def escribir_atomico(archivo, bloques, binario=False):
+    # se escribe en un temporal de la misma carpeta y se renombra al final:
+    # quien lea el archivo ve la versión anterior completa o la nueva completa
+    carpeta = os.path.dirname(os.path.abspath(archivo))
+    fd, temporal = tempfile.mkstemp(dir=carpeta, prefix='.tmp-', suffix=os.path.basename(archivo))
+    try:
+        with (os.fdopen(fd, 'wb') if binario else os.fdopen(fd, 'w', newline='', encoding='utf-8')) as f:
+            for bloque in bloques:
+                f.write(bloque)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, archivo)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def publicar_archivo(origen, destino):
+    # deja 'destino' igual a 'origen' con un reemplazo atómico; con un enlace duro no se
+    # copian los datos (si el sistema de archivos no lo permite, se copia)
+    carpeta = os.path.dirname(os.path.abspath(destino))
+    temporal = os.path.join(carpeta, f'.tmp-{os.getpid()}-{os.path.basename(destino)}')
+    try:
+        os.link(origen, temporal)
+    except OSError:
+        shutil.copyfile(origen, temporal)
+    os.replace(temporal, destino)
+
+
+def exportar_productos(formato, filas=None, archivo=None):
+    if formato not in GENERADORES:
+        raise ValueError(f'Formato no soportado: {formato}')
+    archivo = archivo or ARCHIVOS[formato]
+    escribir_atomico(archivo, GENERADORES[formato](filas if filas is not None else filas_productos()))
+    return archivo
+
+
+# --- Snapshot binario ---
+# Formato columnar para leer con mmap sin parsear texto. Todo en little-endian:
+#   cabecera (80 bytes): magia, versión, banderas, crc32 del cuerpo, n, revisión y
+#                        el desplazamiento de cada sección y el tamaño total
+#   ids       n x int64    (ordenados, para buscar por id con bisect)
+#   cantidad  n x int64
+#   precio    n x float64
+#   índice    (n + 1) x uint64: el nombre i son los bytes [índice[i], índice[i + 1]) de la tabla
+#   nombres   tabla de cadenas UTF-8 seguidas, sin separadores
+# Las secciones empiezan en múltiplos de 8. 'revision' es el último cambio del registro
+# al tomar el snapshot: desde ahí se ponen al día los caches que lo cargan.
+
+SNAPSHOT_MAGIA = b'INVSNAP\x00'
+SNAPSHOT_VERSION = 1
+CABECERA = struct.Struct('<8sHHIQQQQQQQQ')
+
+
+class SnapshotInvalido(ValueError):
+    """El archivo no es un snapshot de esta versión o está dañado."""
+
+
+def _relleno(n):
+    return b'\x00' * (-n % 8)
+
+
+def exportar_snapshot(archivo=SNAPSHOT_FILE, filas=None, revision=None):
+    """Escribe el snapshot desde la BD (o desde 'filas' (id, nombre, cantidad, precio)).
+    Devuelve la cantidad de productos escritos."""
+    if revision is None:
+        # antes que los productos: lo que cambie en medio se vuelve a aplicar después
+        revision = revision_actual() if filas is None else 0
+    ids, cantidades, precios = array('q'), array('q'), array('d')
+    indice, nombres = array('Q', [0]), bytearray()
+    for id, nombre, cantidad, precio in (filas if filas is not None else filas_productos()):
+        ids.append(id)
+        cantidades.append(cantidad)
+        precios.append(precio)
+        nombres += nombre.encode('utf-8')
+        indice.append(len(nombres))
+    n = len(ids)
+    if any(ids[i] >= ids[i + 1] for i in range(n - 1)):
+        orden = sorted(range(n), key=ids.__getitem__)
+        partes = [bytes(nombres[indice[i]:indice[i + 1]]) for i in orden]
+        ids = array('q', (ids[i] for i in orden))
+        cantidades = array('q', (cantidades[i] for i in orden))
+        precios = array('d', (precios[i] for i in orden))
+        indice, nombres = array('Q', [0]), bytearray()
+        for parte in partes:
+            nombres += parte
+            indice.append(len(nombres))
+    if sys.byteorder != 'little':
+        for columna in (ids, cantidades, precios, indice):
+            columna.byteswap()
+
+    cuerpo, desplazamientos, pos = [], [], CABECERA.size
+    for seccion in (ids.tobytes(), cantidades.tobytes(), precios.tobytes(), indice.tobytes(), bytes(nombres)):
+        desplazamientos.append(pos)
+        cuerpo += [seccion, _relleno(len(seccion))]
+        pos += len(seccion) + len(cuerpo[-1])
+    crc = 0
+    for parte in cuerpo:
+        crc = zlib.crc32(parte, crc)
+    cabecera = CABECERA.pack(SNAPSHOT_MAGIA, SNAPSHOT_VERSION, 0, crc, n, revision, *desplazamientos, pos)
+    escribir_atomico(archivo, [cabecera, *cuerpo], binario=True)
+    return n
+
+
+class SnapshotCatalogo:
+    """
+    Lee un snapshot con mmap. Las columnas son memoryview sobre el archivo (sin copiar
+    ni parsear) y cada fila se arma recién cuando se pide; varios procesos que abren
+    el mismo archivo comparten sus páginas en el cache del sistema.
+    verificar=False evita recorrer el archivo entero para el crc32.
+    """
+    def __init__(self, archivo=SNAPSHOT_FILE, verificar=True):
+        if sys.byteorder != 'little':
+            raise SnapshotInvalido('El snapshot solo se lee en máquinas little-endian.')
+        with open(archivo, 'rb') as f:
+            # mmap no acepta archivos vacíos (ValueError): p. ej. una copia que quedó a medias
+            if os.fstat(f.fileno()).st_size < CABECERA.size:
+                raise SnapshotInvalido('Archivo demasiado corto.')
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._vistas = []
+        try:
+            self._abrir(verificar)
+        except Exception:
+            self.cerrar()
+            raise
+
+    def _abrir(self, verificar):
+        if len(self._mm) < CABECERA.size:
+            raise SnapshotInvalido('Archivo demasiado corto.')
+        (magia, version, _banderas, crc, n, self.revision,
+         o_ids, o_cantidad, o_precio, o_indice, o_nombres, fin) = CABECERA.unpack_from(self._mm)
+        if magia != SNAPSHOT_MAGIA:
+            raise SnapshotInvalido('No es un snapshot de productos.')
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotInvalido(f'Versión de snapshot no soportada: {version}')
+        if fin != len(self._mm) or not (CABECERA.size <= o_ids <= o_cantidad <= o_precio <= o_indice
+                                        <= o_nombres <= fin) or o_indice + 8 * (n + 1) > o_nombres:
+            raise SnapshotInvalido('Secciones inconsistentes (¿archivo truncado?).')
+        vista = memoryview(self._mm)
+        self._vistas.append(vista)
+        if verificar and zlib.crc32(vista[CABECERA.size:]) != crc:
+            raise SnapshotInvalido('El crc32 no coincide.')
+        self.n = n
+        self.ids = self._columna(vista, o_ids, n, 'q')
+        self.cantidades = self._columna(vista, o_cantidad, n, 'q')
+        self.precios = self._columna(vista, o_precio, n, 'd')
+        self._indice = self._columna(vista, o_indice, n + 1, 'Q')
+        self._nombres = vista[o_nombres:fin]
+        self._vistas.append(self._nombres)
+
+    def _columna(self, vista, inicio, n, tipo):
+        columna = vista[inicio:inicio + 8 * n].cast(tipo)
+        self._vistas.append(columna)
+        return columna
+
+    def nombre(self, i):
+        return str(self._nombres[self._indice[i]:self._indice[i + 1]], 'utf-8')
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if not -self.n <= i < self.n:
+            raise IndexError(i)
+        i %= self.n
+        return (self.ids[i], self.nombre(i), self.cantidades[i], self.precios[i])
+
+    def buscar(self, id):
+        """Fila del producto 'id' o None (búsqueda binaria sobre la columna de ids)."""
+        i = bisect_left(self.ids, id)
+        return self[i] if i < self.n and self.ids[i] == id else None
+
+    def __iter__(self):
+        # en bloque: las columnas se copian a listas de una vez, más rápido que fila a fila
+        nombres = bytes(self._nombres)
+        indice = self._indice.tolist()
+        return zip(self.ids.tolist(), (str(nombres[a:b], 'utf-8') for a, b in zip(indice, indice[1:])),
+                   self.cantidades.tolist(), self.precios.tolist())
+
+    def cerrar(self):
+        for vista in reversed(self._vistas):
+            vista.release()
+        self._vistas = []
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+# --- Exportación incremental ---
+# Cada producto lleva la revisión de su último cambio y los borrados dejan una lápida
+# (modelos.registrar_cambios), así un delta lee solo lo que cambió entre dos revisiones.
+# En la carpeta de deltas, 'manifiesto.json' tiene una base completa y los deltas en orden:
+#   {"revision": 130, "base": {"archivo": "base-100.ndjson", "revision": 100, ...},
+#    "deltas": [{"archivo": "delta-100-130.ndjson", "desde": 100, "hasta": 130, ...}]}
+# Quien consume parte de la base (o de la revisión que ya tiene) y aplica en orden los
+# deltas con 'desde' >= su revisión. Los archivos son NDJSON ordenados por revisión:
+#   {"id": 7, "nombre": "...", "cantidad": 3, "precio": 9.5, "revision": 120}
+#   {"id": 9, "eliminado": true, "revision": 125}
+
+def revision_actual(margen=0):
+    """Último cambio registrado con al menos 'margen' segundos. El margen evita que una
+    transacción que tomó su id antes, pero confirmó después, quede debajo de una revisión
+    ya exportada (con SQLite las escrituras van de a una y alcanza con 0)."""
+    consulta = select(func.max(CambioProducto.id))
+    if margen:
+        consulta = consulta.where(CambioProducto.fecha <= datetime.utcnow() - timedelta(seconds=margen))
+    return db.session.scalar(consulta) or 0
+
+
+def filas_delta(desde, hasta, tamano_lote=TAMANO_BLOQUE):
+    """Productos y lápidas con desde < revision <= hasta, en orden de revisión."""
+    # las lápidas son pocas: se leen enteras y el cursor de productos queda solo
+    lapidas = db.session.execute(
+        select(ProductoEliminado.id, ProductoEliminado.revision)
+        .where(ProductoEliminado.revision > desde, ProductoEliminado.revision <= hasta)
+        .order_by(ProductoEliminado.revision)
+    ).all()
+    productos = db.session.execute(
+        select(Producto.id, Producto.nombre, Producto.cantidad, Producto.precio, Producto.revision)
+        .where(Producto.revision > desde, Producto.revision <= hasta)
+        .order_by(Producto.revision, Producto.id)
+        .execution_options(yield_per=tamano_lote)
+    )
+    i = 0
+    for fila in productos:
+        while i < len(lapidas) and lapidas[i].revision < fila.revision:
+            yield {'id': lapidas[i].id, 'eliminado': True, 'revision': lapidas[i].revision}
+            i += 1
+        yield dict(zip(CAMPOS + ('revision',), fila))
+    for lapida in lapidas[i:]:
+        yield {'id': lapida.id, 'eliminado': True, 'revision': lapida.revision}
+
+
+def filas_base(tamano_lote=TAMANO_BLOQUE):
+    consulta = (select(Producto.id, Producto.nombre, Producto.cantidad, Producto.precio, Producto.revision)
+                .order_by(Producto.id)
+                .execution_options(yield_per=tamano_lote))
+    for fila in db.session.execute(consulta):
+        yield dict(zip(CAMPOS + ('revision',), fila))
+
+
+def _escribir_ndjson(archivo, filas):
+    # escribe y de paso cuenta filas, bytes y sha256 para el manifiesto
+    entrada = {'archivo': os.path.basename(archivo), 'filas': 0, 'eliminados': 0, 'bytes': 0}
+    sha = hashlib.sha256()
+
+    def formatear(f):
+        entrada['filas'] += 1
+        entrada['eliminados'] += 'eliminado' in f
+        return json.dumps(f, ensure_ascii=False) + '\n'
+
+    def bloques():
+        for bloque in _en_bloques(filas, formatear):
+            datos = bloque.encode('utf-8')
+            sha.update(datos)
+            entrada['bytes'] += len(datos)
+            yield bloque
+
+    escribir_atomico(archivo, bloques())
+    entrada['sha256'] = sha.hexdigest()
+    return entrada
+
+
+def leer_manifiesto(carpeta=DELTAS_DIR):
+    try:
+        with open(os.path.join(carpeta, MANIFIESTO), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def exportar_delta(carpeta=DELTAS_DIR, margen=0, base=False):
+    """
+    Escribe un delta con lo cambiado desde la última exportación y lo agrega al manifiesto.
+    Sin manifiesto, o con base=True, escribe una base completa nueva: los deltas anteriores
+    y las lápidas que ya quedaron dentro de la base se borran.
+    Devuelve la entrada agregada al manifiesto, o None si no hubo cambios.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    with open(os.path.join(carpeta, '.lock'), 'w') as candado:
+        if fcntl is not None:
+            fcntl.flock(candado, fcntl.LOCK_EX)  # un solo proceso exporta a la vez
+        manifiesto = leer_manifiesto(carpeta)
+        hasta = revision_actual(margen)
+        if manifiesto is not None and not base:
+            desde = manifiesto['revision']
+            if hasta <= desde:
+                return None
+            entrada = _escribir_ndjson(os.path.join(carpeta, f'delta-{desde}-{hasta}.ndjson'),
+                                       filas_delta(desde, hasta))
+            entrada.update(desde=desde, hasta=hasta, fecha=datetime.utcnow().isoformat())
+            manifiesto['deltas'].append(entrada)
+            manifiesto['revision'] = hasta
+            escribir_atomico(os.path.join(carpeta, MANIFIESTO), [json.dumps(manifiesto, indent=2)])
+            return entrada
+
+        # base completa: las filas cambiadas mientras se escribe vuelven en el próximo delta
+        entrada = _escribir_ndjson(os.path.join(carpeta, f'base-{hasta}.ndjson'), filas_base())
+        entrada.update(revision=hasta, fecha=datetime.utcnow().isoformat())
+        anteriores = set()
+        if manifiesto is not None:
+            anteriores = {d['archivo'] for d in manifiesto['deltas']} | {manifiesto['base']['archivo']}
+        escribir_atomico(os.path.join(carpeta, MANIFIESTO),
+                         [json.dumps({'revision': hasta, 'base': entrada, 'deltas': []}, indent=2)])
+        for archivo in anteriores - {entrada['archivo']}:
+            try:
+                os.remove(os.path.join(carpeta, archivo))
+            except FileNotFoundError:
+                pass
+        db.session.execute(delete(ProductoEliminado).where(ProductoEliminado.revision <= hasta))
+        db.session.commit()
+        return entrada
+
+
+# --- Lectura por streaming ---
+# Devuelven dicts sin convertir, una fila a la vez (memoria constante);
+# la validación la hace quien consume (ver importacion.py).
+
+def iterar_productos_txt(archivo=TXT_FILE):
+    with open(archivo, 'r', encoding='utf-8') as f:
+        for linea in f:
+            partes = linea.rstrip('\r\n').split(',')
+            if len(partes) >= 4:
+                # el TXT no escapa comas: id al inicio, cantidad y precio al final
+                yield {'id': partes[0], 'nombre': ','.join(partes[1:-2]),
+                       'cantidad': partes[-2], 'precio': partes[-1]}
+
+
+def iterar_productos_json(archivo=JSON_FILE):
+    # lee un arreglo JSON (o NDJSON) objeto por objeto con raw_decode
+    decoder = json.JSONDecoder()
+    with open(archivo, 'r', encoding='utf-8') as f:
+        buffer, pos, fin_archivo = '', 0, False
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,[':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                if pos >= len(buffer):
+                    raise ValueError
+                obj, pos = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if fin_archivo:
+                    if buffer[pos:].strip():
+                        raise
+                    return
+                trozo = f.read(64 * 1024)
+                fin_archivo = not trozo
+                buffer, pos = buffer[pos:] + trozo, 0
+                continue
+            yield obj
+
+
+def iterar_productos_csv(archivo=CSV_FILE):
+    with open(archivo, 'r', newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+LECTORES = {
+    'txt': iterar_productos_txt,
+    'json': iterar_productos_json,
+    'ndjson': iterar_productos_json,
+    'csv': iterar_productos_csv,
+}
+
+
+def _tuplas(productos):
+    return ((p['id'], p['nombre'], p['cantidad'], p['precio']) for p in productos)
 
 # --- TXT ---
 def guardar_productos_txt(productos, archivo=TXT_FILE):
-    with open(archivo, 'w', encoding='utf-8') as f:
-        for p in productos:
-            linea = f"{p['id']},{p['nombre']},{p['cantidad']},{p['precio']}\n"
-            f.write(linea)
+    escribir_atomico(archivo, generar_txt(_tuplas(productos)))
 
 def leer_productos_txt(archivo=TXT_FILE):
     productos = []
@@ -40,8 +518,7 @@ def leer_productos_txt(archivo=TXT_FILE):
 
 # --- JSON ---
 def guardar_productos_json(productos, archivo=JSON_FILE):
-    with open(archivo, 'w', encoding='utf-8') as f:
-        json.dump(productos, f, ensure_ascii=False, indent=4)
+    escribir_atomico(archivo, generar_json(_tuplas(productos)))
 
 def leer_productos_json(archivo=JSON_FILE):
     try:
@@ -52,10 +529,7 @@ def leer_productos_json(archivo=JSON_FILE):
 
 # --- CSV ---
 def guardar_productos_csv(productos, archivo=CSV_FILE):
-    with open(archivo, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=['id', 'nombre', 'cantidad', 'precio'])
-        writer.writeheader()
-        writer.writerows(productos)
+    escribir_atomico(archivo, generar_csv(_tuplas(productos)))
 
 def leer_productos_csv(archivo=CSV_FILE):
     productos = []
@@ -0,0 +1,126 @@
+# Acceso a datos de clientes, usuarios y compras.
+# Todo pasa por el mismo motor SQLAlchemy (db.engine: SQLite o MySQL según DATABASE_URL)
+# y la misma sesión por petición; los productos van por el Inventario (cache + registro de cambios).
+# Las sentencias fijas se arman una vez con bindparam, así SQLAlchemy reutiliza la
+# versión compilada en cada ejecución.
+from sqlalchemy import select, update, insert, func, and_, or_, bindparam
+from modelos import db, Producto, Cliente, UsuarioBD, Compra
+from estadisticas import registrar_usuario
+
+# --- Usuarios ---
+
+USUARIO_POR_EMAIL = (select(UsuarioBD.id, UsuarioBD.nombre, UsuarioBD.email, UsuarioBD.password, UsuarioBD.rol)
+                     .where(UsuarioBD.email == bindparam('email')))
+USUARIO_POR_ID = (select(UsuarioBD.id, UsuarioBD.nombre, UsuarioBD.email, UsuarioBD.rol, UsuarioBD.version)
+                  .where(UsuarioBD.id == bindparam('id')))
+VERSION_USUARIO = select(UsuarioBD.version).where(UsuarioBD.id == bindparam('id'))
+
+
+def usuario_por_email(email):
+    """(id, nombre, email, password, rol) o None."""
+    return db.session.execute(USUARIO_POR_EMAIL, {'email': email}).first()
+
+
+def usuario_por_id(usuario_id):
+    """(id, nombre, email, rol, version) o None; sin el hash de la contraseña."""
+    return db.session.execute(USUARIO_POR_ID, {'id': usuario_id}).first()
+
+
+def version_usuario(usuario_id):
+    """Versión actual del usuario (cambia con el rol o la contraseña) o None si no existe."""
+    return db.session.scalar(VERSION_USUARIO, {'id': usuario_id})
+
+
+def crear_usuario(nombre, email, password_hash, rol='user'):
+    # IntegrityError si el email ya existe
+    try:
+        usuario_id = db.session.execute(
+            insert(UsuarioBD).values(nombre=nombre, email=email, password=password_hash, rol=rol)
+        ).inserted_primary_key[0]
+        registrar_usuario()  # contador del dashboard, en la misma transacción
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return usuario_id
+
+
+def _cambiar_usuario(usuario_id, **valores):
+    r = db.session.execute(update(UsuarioBD).where(UsuarioBD.id == usuario_id)
+                           .values(**valores, version=UsuarioBD.version + 1))
+    db.session.commit()
+    return r.rowcount > 0
+
+
+def cambiar_rol(usuario_id, rol):
+    return _cambiar_usuario(usuario_id, rol=rol)
+
+
+def cambiar_password(usuario_id, password_hash):
+    return _cambiar_usuario(usuario_id, password=password_hash)
+
+
+# --- Compras ---
+
+def historial_compras(usuario_id, limit, desde=None, hasta=None, antes=None):
+    """
+    Compras del usuario de la más nueva a la más vieja, paginadas por (fecha, id)
+    sobre ix_compras_usuario_fecha_id. antes=(fecha, id) es el cursor de la página.
+    Devuelve hasta limit + 1 filas (id, producto, cantidad, fecha) sin cargarlas todas.
+    """
+    consulta = (select(Compra.id, Producto.nombre.label('producto'), Compra.cantidad, Compra.fecha)
+                .join(Producto, Producto.id == Compra.producto_id)
+                .where(Compra.usuario_id == usuario_id))
+    if desde is not None:
+        consulta = consulta.where(Compra.fecha >= desde)
+    if hasta is not None:
+        consulta = consulta.where(Compra.fecha < hasta)
+    if antes is not None:
+        fecha, id = antes
+        consulta = consulta.where(or_(Compra.fecha < fecha, and_(Compra.fecha == fecha, Compra.id < id)))
+    consulta = consulta.order_by(Compra.fecha.desc(), Compra.id.desc()).limit(limit + 1)
+    # stream_results: las filas llegan mientras se itera (cursor del lado del servidor en MySQL)
+    return db.session.execute(consulta.execution_options(stream_results=True, yield_per=100))
+
+
+def mas_vendidos(limite=10):
+    """[(producto_id, unidades)] de mayor a menor; la agregación la hace la BD."""
+    unidades = func.sum(Compra.cantidad).label('unidades')
+    filas = db.session.execute(
+        select(Compra.producto_id, unidades).group_by(Compra.producto_id).order_by(unidades.desc()).limit(limite)
+    )
+    return [(int(pid), int(total)) for pid, total in filas]
+
+
+# --- Clientes ---
+
+def pagina_clientes(limit, q='', despues=None, despues_id=None, campos=None):
+    """
+    Paginación por clave (nombre, id): cada página es un "seek" en ix_clientes_nombre_id.
+    Con 'campos' devuelve filas con esas columnas; si no, objetos Cliente.
+    Devuelve (filas, siguiente) con siguiente = {'despues', 'despues_id'} o None.
+    """
+    if campos:
+        consulta = select(*(getattr(Cliente, c) for c in campos), Cliente.nombre, Cliente.id)
+    else:
+        consulta = select(Cliente)
+    if q:
+        prefijo = q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        consulta = consulta.where(or_(Cliente.nombre.like(prefijo, escape='\\'),
+                                      Cliente.correo_electronico.like(prefijo, escape='\\')))
+    if despues is not None and despues_id is not None:
+        consulta = consulta.where(or_(Cliente.nombre > despues,
+                                      and_(Cliente.nombre == despues, Cliente.id > despues_id)))
+    consulta = consulta.order_by(Cliente.nombre, Cliente.id).limit(limit + 1)
+    if campos:
+        filas = db.session.execute(consulta).all()
+        claves = [(f[-2], f[-1]) for f in filas]
+        filas = [tuple(f[:len(campos)]) for f in filas]
+    else:
+        filas = db.session.scalars(consulta).all()
+        claves = [(c.nombre, c.id) for c in filas]
+    siguiente = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        siguiente = {'despues': claves[limit - 1][0], 'despues_id': claves[limit - 1][1]}
+    return filas, siguiente
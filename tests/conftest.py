@@ -0,0 +1,57 @@
+# Las pruebas corren contra SQLite en una carpeta temporal. La configuración de la app
+# se lee del entorno al importar app.py, así que se fija antes de importarla.
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+import pytest
+from jinja2 import ChoiceLoader, DictLoader
+
+CARPETA = tempfile.mkdtemp(prefix='inventario-pruebas-')
+atexit.register(shutil.rmtree, CARPETA, ignore_errors=True)
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(CARPETA, 'inventario.db'),
+    'CREAR_TABLAS_AL_INICIAR': '1',
+    'INVENTARIO_SNAPSHOT': '',
+    'TRABAJOS_HILOS': '0',
+    'PASSWORD_PROCESOS': '0',
+    'PASSWORD_METODO': 'pbkdf2:sha256:1000',
+    'LOGIN_INTENTOS_IP': '100000',
+    'PROXY_SALTOS': '1',
+    'ESTADISTICAS_TTL': '0',
+    'INVENTARIO_TTL': '3600',  # sin revisiones por tiempo: consultas deterministas
+    'USUARIOS_VERIFICAR': '3600',
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# plantillas que faltan en templates/ (y base.html, que se extiende a sí misma)
+PLANTILLAS = {
+    'base.html': '{{ get_flashed_messages() }}{% block content %}{% endblock %}',
+    'login.html': '{% extends "base.html" %}',
+    'dashboard.html': '{% extends "base.html" %}{% block content %}{{ total_productos }}{% endblock %}',
+    'carrito.html': '{% extends "base.html" %}',
+}
+
+
+@pytest.fixture(scope='session')
+def app():
+    import app as modulo
+    aplicacion = modulo.app
+    aplicacion.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    aplicacion.jinja_loader = ChoiceLoader([DictLoader(PLANTILLAS), aplicacion.jinja_loader])
+    aplicacion.jinja_env.loader = aplicacion.jinja_loader
+    return aplicacion
+
+
+@pytest.fixture
+def contexto(app):
+    with app.app_context():
+        yield
+        from modelos import db
+        db.session.remove()
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
@@ -0,0 +1,9 @@
+import app as modulo
+
+
+def test_ids_booleanos_se_rechazan(cliente, contexto):
+    p = modulo.inventario.agregar('Api Booleano', 4, 1.0)
+    assert cliente.patch('/api/v1/productos', json=[{'id': True, 'cantidad': 9}]).status_code == 422
+    assert cliente.delete('/api/v1/productos', json={'ids': [True]}).status_code == 400
+    assert cliente.delete('/api/v1/clientes', json={'ids': [False]}).status_code == 400
+    assert modulo.inventario.obtener(p.id).cantidad == 4
@@ -0,0 +1,39 @@
+import threading
+from modelos import db
+from carrito import AlmacenCarritoBD
+
+HILOS = 16
+
+
+def test_agregados_simultaneos_del_mismo_producto(app, contexto):
+    almacen = AlmacenCarritoBD()
+    cid = almacen.crear()
+    largada = threading.Barrier(HILOS)
+    errores = []
+
+    def agregar():
+        with app.app_context():
+            largada.wait()
+            try:
+                almacen.agregar(cid, 42, 1)
+            except Exception as e:
+                errores.append(e)
+            finally:
+                db.session.remove()
+
+    hilos = [threading.Thread(target=agregar) for _ in range(HILOS)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert errores == []
+    assert almacen.lineas(cid) == {42: HILOS}
+
+
+def test_agregar_a_un_carrito_sin_fila(app, contexto):
+    almacen = AlmacenCarritoBD()
+    almacen.agregar('sin-fila-todavia', 7, 2)
+    almacen.agregar('sin-fila-todavia', 7, 3)
+    assert almacen.existe('sin-fila-todavia')
+    assert almacen.lineas('sin-fila-todavia') == {7: 5}
@@ -0,0 +1,46 @@
+import threading
+from sqlalchemy import select, func
+from modelos import db, Producto, Compra
+from compras import comprar_lineas
+import app as modulo
+
+STOCK = 25
+COMPRADORES = 60
+
+
+def test_compras_concurrentes_no_venden_de_mas(app, contexto):
+    producto = modulo.inventario.agregar('Compras Concurrentes', STOCK, 3.0)
+    usuario_id = modulo.repositorio.crear_usuario('Comprador', 'compras-concurrentes@ejemplo.com', 'x')
+    largada = threading.Barrier(COMPRADORES)
+    resultados, errores = [], []
+
+    def comprar():
+        with app.app_context():
+            largada.wait()
+            try:
+                resultados.append(comprar_lineas(usuario_id, {producto.id: 1})[0])
+            except Exception as e:
+                errores.append(e)
+            finally:
+                db.session.remove()
+
+    hilos = [threading.Thread(target=comprar) for _ in range(COMPRADORES)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert errores == []
+    assert resultados.count(True) == STOCK
+    assert db.session.scalar(select(Producto.cantidad).where(Producto.id == producto.id)) == 0
+    vendidas = db.session.scalar(select(func.sum(Compra.cantidad)).where(Compra.producto_id == producto.id))
+    assert vendidas == STOCK
+
+
+def test_compra_sin_stock_no_registra_nada(app, contexto):
+    a = modulo.inventario.agregar('Compras Linea A', 5, 1.0)
+    b = modulo.inventario.agregar('Compras Linea B', 1, 1.0)
+    ok, resultados = comprar_lineas(1, {a.id: 2, b.id: 3})
+    assert not ok
+    assert {r['producto_id']: r['ok'] for r in resultados} == {a.id: True, b.id: False}
+    assert db.session.scalar(select(Producto.cantidad).where(Producto.id == a.id)) == 5
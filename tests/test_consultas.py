@@ -0,0 +1,69 @@
+# Consultas SQL por petición en las rutas de usuarios, compras y estadísticas.
+# instrumentacion las cuenta y las informa en el encabezado Server-Timing; estos
+# topes son los valores actuales: si una ruta empieza a hacer más consultas, falla.
+import re
+import pytest
+import app as modulo
+
+PASSWORD = 'clave-de-prueba'
+
+
+def consultas(respuesta):
+    return int(re.search(r'"(\d+) consultas"', respuesta.headers['Server-Timing']).group(1))
+
+
+@pytest.fixture(scope='module')
+def datos(app):
+    with app.app_context():
+        modulo.inventario.calentar()
+        producto = modulo.inventario.agregar('Consultas Producto', 1000, 2.5)
+        hash_ = modulo.hashes.generar(PASSWORD)
+        modulo.repositorio.crear_usuario('Cliente', 'consultas@ejemplo.com', hash_)
+        modulo.repositorio.crear_usuario('Admin', 'consultas-admin@ejemplo.com', hash_, rol='admin')
+    return {'producto': producto.id}
+
+
+def _sesion(cliente, email):
+    r = cliente.post('/login', data={'email': email, 'password': PASSWORD})
+    assert r.status_code == 302
+    return r
+
+
+def _revisar(cliente, pasos):
+    for metodo, url, datos, tope in pasos:
+        r = cliente.open(url, method=metodo, data=datos)
+        assert r.status_code < 400, url
+        assert consultas(r) <= tope, f'{metodo} {url}: {consultas(r)} consultas (tope {tope})'
+
+
+def test_consultas_registro_y_login(cliente, datos):
+    _revisar(cliente, [
+        ('POST', '/register', {'nombre': 'Nuevo', 'email': 'consultas-nuevo@ejemplo.com', 'password': PASSWORD}, 2),
+    ])
+    assert consultas(_sesion(cliente, 'consultas@ejemplo.com')) <= 1
+    _revisar(cliente, [('GET', '/logout', None, 0)])
+
+
+def test_consultas_cliente(cliente, datos):
+    pid = datos['producto']
+    _sesion(cliente, 'consultas@ejemplo.com')
+    for _ in range(2):  # la segunda vuelta con los caches ya llenos
+        _revisar(cliente, [
+            ('GET', '/productos', None, 1),
+            ('GET', '/api/v1/productos?limit=10', None, 0),
+            ('POST', f'/productos/{pid}/comprar', {'cantidad': 1}, 10),
+            ('POST', f'/agregar_al_carrito/{pid}', {'cantidad': 1}, 4),
+            ('GET', '/carrito', None, 2),
+            ('POST', '/carrito/comprar', None, 14),
+            ('GET', '/mis-compras', None, 1),
+            ('GET', '/dashboard', None, 0),
+        ])
+
+
+def test_consultas_admin(cliente, datos):
+    _sesion(cliente, 'consultas-admin@ejemplo.com')
+    _revisar(cliente, [
+        ('GET', '/dashboard', None, 1),
+        ('GET', '/clientes', None, 1),
+        ('GET', '/reportes/inventario', None, 1),
+    ])
@@ -0,0 +1,29 @@
+import os
+import json
+from sqlalchemy import select, func
+from modelos import db, ProductoEliminado
+from inventario import Inventario
+from persistencia import exportar_delta
+
+
+def _filas_delta(carpeta, entrada):
+    with open(os.path.join(carpeta, entrada['archivo']), encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f]
+
+
+def test_cambio_diferido_no_borra_la_lapida_de_otro_worker(app, contexto, tmp_path):
+    carpeta = str(tmp_path)
+    otro = app.extensions['inventario']
+    x = otro.agregar('Diferido Borrado', 3, 2.0)
+    exportar_delta(carpeta, margen=0, base=True)
+
+    worker = Inventario.cargar_desde_bd(ttl=0)
+    worker.activar_escritura_diferida(app, intervalo=3600, max_pendientes=10 ** 6)
+    worker.actualizar(x.id, cantidad=5)  # queda pendiente en este worker
+    assert otro.eliminar(x.id)            # otro worker lo borra y deja la lápida
+    assert worker.vaciar_pendientes() == 0  # el UPDATE no encontró el producto
+
+    lapidas = db.session.scalar(select(func.count()).where(ProductoEliminado.id == x.id))
+    assert lapidas == 1
+    filas = _filas_delta(carpeta, exportar_delta(carpeta, margen=0))
+    assert [f.get('eliminado') for f in filas if f['id'] == x.id] == [True]
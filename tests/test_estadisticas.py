@@ -0,0 +1,14 @@
+from decimal import Decimal
+from estadisticas import ResumenCache
+import app as modulo
+
+
+def test_resumen_devuelve_conteos_enteros(app, contexto):
+    producto = modulo.inventario.agregar('Resumen Producto', 10, 2.5)
+    usuario_id = modulo.repositorio.crear_usuario('Resumen', 'resumen@ejemplo.com', 'x')
+    assert modulo.comprar_lineas(usuario_id, {producto.id: 2})[0]
+
+    totales = ResumenCache(ttl=0).obtener()
+    for clave in ('usuarios', 'compras', 'unidades_vendidas'):
+        assert type(totales[clave]) is int and totales[clave] >= 1
+    assert isinstance(totales['ingresos'], Decimal) and totales['ingresos'] >= Decimal('5.00')
@@ -0,0 +1,58 @@
+from sqlalchemy import select, func
+from modelos import db, Producto
+from importacion import importar_productos
+
+
+def _productos(prefijo):
+    return db.session.execute(
+        select(Producto.nombre, Producto.cantidad, Producto.precio)
+        .where(func.lower(Producto.nombre).like(prefijo.lower() + '%'))
+    ).all()
+
+
+def test_importar_no_distingue_mayusculas(app, contexto):
+    inventario = app.extensions['inventario']
+    inventario.agregar('ImpPan', 1, 1.0)
+    inventario.agregar('ImpLeche', 2, 2.0)
+
+    resumen = importar_productos([
+        {'nombre': 'imppan', 'cantidad': 10, 'precio': 1.5},
+        {'nombre': 'IMPLECHE', 'cantidad': 20, 'precio': 2.5},
+        {'nombre': 'ImpAzucar', 'cantidad': 3, 'precio': 4},
+    ], inventario=inventario)
+
+    assert (resumen['insertados'], resumen['actualizados'], resumen['rechazados']) == (1, 2, 0)
+    # se actualiza la fila existente y conserva su nombre
+    assert sorted(_productos('Imp')) == [('ImpAzucar', 3, 4.0), ('ImpLeche', 20, 2.5), ('ImpPan', 10, 1.5)]
+    assert [p.nombre for p in inventario.buscar_por_nombre('imp')] == ['ImpAzucar', 'ImpLeche', 'ImpPan']
+
+
+def test_importar_repetidos_en_el_lote(app, contexto):
+    resumen = importar_productos([
+        {'nombre': 'LoteCafe', 'cantidad': 1, 'precio': 1},
+        {'nombre': 'lotecafe', 'cantidad': 2, 'precio': 2},
+        {'nombre': 'LOTECAFE', 'cantidad': 3, 'precio': 3},
+    ], inventario=app.extensions['inventario'])
+
+    assert (resumen['insertados'], resumen['actualizados']) == (1, 0)
+    assert _productos('LoteCafe') == [('LOTECAFE', 3, 3.0)]  # gana la última fila
+
+
+def test_importar_rechaza_filas_invalidas(app, contexto):
+    resumen = importar_productos([
+        {'nombre': '', 'cantidad': 1, 'precio': 1},
+        {'nombre': 'InvalidoTe', 'cantidad': -1, 'precio': 1},
+        {'nombre': 'InvalidoMate', 'cantidad': 1, 'precio': 1},
+    ])
+
+    assert (resumen['insertados'], resumen['rechazados']) == (1, 2)
+    assert [n for n, _ in resumen['errores']] == [1, 2]
+
+
+def test_validar_producto_mismos_limites_que_el_formulario():
+    from formularios import validar_producto
+    for malo in ({'precio': float('inf')}, {'precio': float('nan')}, {'precio': 'inf'}, {'precio': 0},
+                 {'precio': True}, {'cantidad': float('inf')}, {'cantidad': 1.5}, {'cantidad': True}):
+        assert validar_producto({'nombre': 'x', 'cantidad': 1, 'precio': 1, **malo})[1], malo
+    assert validar_producto({'nombre': 'Agotado', 'cantidad': 0, 'precio': '2.345'}) == (
+        {'nombre': 'Agotado', 'cantidad': 0, 'precio': 2.35}, None)
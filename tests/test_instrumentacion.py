@@ -0,0 +1,41 @@
+import sqlite3
+import threading
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from modelos import db
+from instrumentacion import PoolMedido, metricas_pool
+
+
+def test_pool_medido_cuenta_aciertos_fallos_y_espera(tmp_path):
+    pool = PoolMedido(lambda: sqlite3.connect(tmp_path / 'pool.db', check_same_thread=False),
+                      pool_size=1, max_overflow=0, timeout=5)
+    antes = metricas_pool.metricas()
+
+    pool.connect().close()  # abre la conexión: fallo
+    ocupada = pool.connect()  # la reutiliza: acierto
+    soltar = threading.Timer(0.1, ocupada.close)
+    soltar.start()
+    pool.connect().close()  # espera a que se libere
+    soltar.join()
+
+    despues = metricas_pool.metricas()
+    assert despues['fallos'] - antes['fallos'] == 1
+    assert despues['aciertos'] - antes['aciertos'] == 2
+    assert despues['esperas'] - antes['esperas'] == 1
+    assert despues['tiempo_espera_s'] - antes['tiempo_espera_s'] >= 0.05
+    pool.dispose()
+
+
+def test_estado_conexiones_expone_metricas_del_pool(cliente):
+    datos = cliente.get('/estado/conexiones').get_json()
+    assert {'aciertos', 'fallos', 'esperas', 'tiempo_espera_s', 'checkedout'} <= set(datos)
+
+
+def test_consulta_que_falla_no_deja_su_inicio(app, contexto):
+    conexion = db.session.connection()
+    antes = len(conexion.info.get('_inicio_consulta', []))
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            conexion.execute(text('SELECT * FROM tabla_que_no_existe'))
+    assert len(conexion.info.get('_inicio_consulta', [])) == antes
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import insert, update
+from modelos import db, Producto, CambioProducto
+from inventario import Inventario, ProductoLigero
+
+
+def _cambiar_cantidad(producto_id, cantidad, cambio_id):
+    # como otra transacción: el cambio queda registrado con un id elegido a mano
+    db.session.execute(update(Producto).where(Producto.id == producto_id).values(cantidad=cantidad))
+    db.session.execute(insert(CambioProducto).values(id=cambio_id, producto_id=producto_id))
+    db.session.commit()
+
+
+def test_sincronizar_aplica_cambios_que_confirman_tarde(app, contexto):
+    a, b = app.extensions['inventario'].agregar_varios([
+        {'nombre': 'TardeA', 'cantidad': 1, 'precio': 1},
+        {'nombre': 'TardeB', 'cantidad': 1, 'precio': 1},
+    ])
+    worker = Inventario.cargar_desde_bd(ttl=0)
+    v = worker.version
+
+    # la transacción que tomó v+1 confirma después de la que tomó v+2
+    _cambiar_cantidad(a.id, 7, v + 2)
+    assert worker.sincronizar(forzar=True) == 1
+    assert worker.version == v + 2
+    catalogo = worker.version_catalogo()
+
+    _cambiar_cantidad(b.id, 9, v + 1)
+    assert worker.sincronizar(forzar=True) == 1
+    assert worker.productos[b.id].cantidad == 9
+    assert worker.version == v + 2
+    assert worker.version_catalogo() != catalogo  # las páginas cacheadas no quedan viejas
+    assert worker.sincronizar(forzar=True) == 0  # no se vuelve a aplicar
+
+
+def test_carga_no_reaplica_cambios_ya_incluidos(app, contexto):
+    app.extensions['inventario'].agregar('YaIncluido', 1, 1)
+    worker = Inventario.cargar_desde_bd(ttl=0)
+    assert worker.sincronizar(forzar=True) == 0
+    assert worker.tardios == 0
+
+
+def test_actualizar_producto_borrado_por_otro_worker(app, contexto):
+    otro = app.extensions['inventario']
+    p = otro.agregar('BorradoPorOtro', 1, 1)
+    worker = Inventario.cargar_desde_bd(ttl=3600)  # su cache todavía tiene el producto
+    assert otro.eliminar(p.id)
+    with pytest.raises(LookupError):
+        worker.actualizar_varios([{'id': p.id, 'cantidad': 2}])
+    assert p.id not in worker.productos
+    assert worker.actualizar(p.id, cantidad=2) is None
+
+
+def _buscar_a_mano(inventario, q):
+    return sorted(k for k in inventario._claves.values() if q.lower() in k)
+
+
+def test_buscar_por_nombre_con_cambios_despues_de_armar_el_indice():
+    nombres = ['Tornillo 3mm', 'tornillo 5mm', 'Tuerca M3', 'Arandela', 'Tornillería fina', 'Clavo']
+    inv = Inventario({i: ProductoLigero(i, n, 1, 1.0) for i, n in enumerate(nombres, 1)}, ttl=3600)
+    assert [p.nombre for p in inv.buscar_por_nombre('TORN')] == ['Tornillería fina', 'Tornillo 3mm', 'tornillo 5mm']
+
+    # renombrado, borrado y alta después de armar el índice
+    inv._desindexar(1)
+    inv.productos[1] = ProductoLigero(1, 'Perno 3mm', 1, 1.0)
+    inv._indexar(1, 'Perno 3mm')
+    inv._desindexar(2)
+    inv.productos.pop(2)
+    inv.productos[7] = ProductoLigero(7, 'Tornillo 8mm', 1, 1.0)
+    inv._indexar(7, 'Tornillo 8mm')
+    for q in ('torn', '3mm', 'mm', 'llo', 'zzz'):
+        assert [p.nombre.lower() for p in inv.buscar_por_nombre(q)] == _buscar_a_mano(inv, q)
+
+    pagina = inv.buscar_por_nombre('mm', limit=1, offset=1)
+    assert [p.nombre for p in pagina] == ['Tornillo 8mm']
+    assert [p.nombre for p in inv.buscar_por_nombre('mm', limit=5, despues='perno 3mm')] == ['Tornillo 8mm']
+    # 'torn' está en media lista: recorre el orden en vez de filtrar candidatos
+    assert [p.nombre for p in inv.buscar_por_nombre('torn', limit=1, offset=1)] == ['Tornillo 8mm']
@@ -0,0 +1,28 @@
+import pytest
+import app as modulo
+
+
+@pytest.fixture
+def limite_ip():
+    limitador = modulo.intentos_ip
+    anterior = limitador.max_intentos
+    limitador.max_intentos = 2
+    yield limitador
+    limitador.max_intentos = anterior
+    limitador._intentos.clear()
+    modulo.fallos_cuenta.limpiar('nadie@ejemplo.com')
+
+
+def _login(cliente, ip):
+    return cliente.post('/login', data={'email': 'nadie@ejemplo.com', 'password': 'x'},
+                        headers={'X-Forwarded-For': ip})
+
+
+def test_limite_por_ip_usa_la_ip_del_cliente_detras_del_proxy(cliente, limite_ip):
+    assert _login(cliente, '203.0.113.1').status_code == 200
+    assert _login(cliente, '203.0.113.1').status_code == 200
+    bloqueado = _login(cliente, '203.0.113.1')
+    assert bloqueado.status_code == 429
+    assert int(bloqueado.headers['Retry-After']) > 0
+    # otro cliente detrás del mismo proxy no queda bloqueado
+    assert _login(cliente, '203.0.113.2').status_code == 200
@@ -0,0 +1,28 @@
+import pytest
+from persistencia import SnapshotCatalogo, SnapshotInvalido, exportar_snapshot
+from inventario import Inventario
+
+
+def test_snapshot_ida_y_vuelta(tmp_path):
+    archivo = tmp_path / 'catalogo.snap'
+    filas = [(1, 'Pan, integral', 3, 1.5), (2, 'Café ñandú', 0, 10.25)]
+    assert exportar_snapshot(str(archivo), filas=filas, revision=7) == 2
+    with SnapshotCatalogo(str(archivo)) as snap:
+        assert snap.revision == 7
+        assert list(snap) == filas
+
+
+@pytest.mark.parametrize('contenido', [b'', b'SNAP'])
+def test_snapshot_vacio_o_truncado_es_invalido(tmp_path, contenido):
+    archivo = tmp_path / 'catalogo.snap'
+    archivo.write_bytes(contenido)
+    with pytest.raises(SnapshotInvalido):
+        SnapshotCatalogo(str(archivo))
+
+
+def test_inventario_con_snapshot_vacio_carga_desde_la_bd(app, contexto, tmp_path):
+    app.extensions['inventario'].agregar('SnapshotVacio', 4, 1)
+    archivo = tmp_path / 'catalogo.snap'
+    archivo.write_bytes(b'')
+    inventario = Inventario.cargar(snapshot=str(archivo))
+    assert 'snapshotvacio' in inventario.nombres
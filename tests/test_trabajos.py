@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert
+from modelos import db, Trabajo
+from trabajos import Ejecutor, tarea, encolar, estado
+
+
+@tarea('prueba_eco')
+def _eco(progreso, valor):
+    return {'valor': valor}
+
+
+def _escrituras(funcion):
+    sentencias = []
+
+    def anotar(conn, cursor, sentencia, parametros, contexto, executemany):
+        if sentencia.lstrip().split(None, 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            sentencias.append(sentencia)
+    event.listen(db.engine, 'before_cursor_execute', anotar)
+    try:
+        resultado = funcion()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', anotar)
+    return resultado, sentencias
+
+
+def test_cola_vacia_solo_lee(app, contexto):
+    ejecutor = Ejecutor(app, hilos=0)
+    while ejecutor.correr_uno():  # lo que hayan dejado otras pruebas
+        pass
+    corrio, escrituras = _escrituras(ejecutor.correr_uno)
+    assert corrio is False
+    assert escrituras == []
+
+
+def test_rescata_trabajos_sin_latido(app, contexto):
+    ejecutor = Ejecutor(app, hilos=0, vencimiento=60)
+    viejo = datetime.utcnow() - timedelta(minutes=10)
+    trabajo_id = db.session.execute(insert(Trabajo).values(
+        tipo='prueba_eco', parametros='{"valor": 1}', clave='perdido', clave_activa='perdido',
+        estado='en_curso', worker='otro:1:1', iniciado=viejo, latido=viejo,
+    )).inserted_primary_key[0]
+    db.session.commit()
+
+    assert ejecutor.correr_uno()
+    assert estado(trabajo_id)['estado'] == 'terminado'
+    assert estado(trabajo_id)['resultado'] == {'valor': 1}
+
+
+def test_encolar_y_correr(app, contexto):
+    ejecutor = Ejecutor(app, hilos=0)
+    trabajo_id = encolar('prueba_eco', valor=2)
+    assert encolar('prueba_eco', valor=2) == trabajo_id  # mismo trabajo activo
+    assert ejecutor.correr_uno()
+    assert estado(trabajo_id)['resultado'] == {'valor': 2}
@@ -0,0 +1,23 @@
+import repositorio
+from usuarios import CacheUsuarios
+from conexion.models.user import Usuario
+
+
+def test_cambio_de_rol_en_otro_proceso_llega_al_cache(app, contexto):
+    uid = repositorio.crear_usuario('Rol', 'rol-otro-proceso@ejemplo.com', 'x', rol='admin')
+    cache = CacheUsuarios(ttl=60, verificar=0)
+    confiado = CacheUsuarios(ttl=60, verificar=3600)
+    assert cache.obtener(uid).es_admin() and confiado.obtener(uid).es_admin()
+
+    # como `flask bd rol`: otro proceso, sin pasar por estos caches
+    assert repositorio.cambiar_rol(uid, 'user')
+    assert not cache.obtener(uid).es_admin()
+    assert confiado.obtener(uid).es_admin()  # hasta su próxima verificación
+
+
+def test_usuario_guardado_en_el_login_se_relee_al_verificar(app, contexto):
+    uid = repositorio.crear_usuario('Login', 'rol-login@ejemplo.com', 'x', rol='admin')
+    cache = CacheUsuarios(ttl=60, verificar=0)
+    cache.guardar(Usuario(uid, 'Login', 'rol-login@ejemplo.com', None, 'admin'))
+    repositorio.cambiar_rol(uid, 'user')
+    assert cache.obtener(uid).rol == 'user'
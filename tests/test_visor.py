@@ -0,0 +1,36 @@
+import os
+from visor import VisorArchivos, PASO
+
+
+def _escribir(ruta, lineas):
+    with open(ruta, 'w') as f:
+        f.writelines(lineas)
+
+
+def test_reemplazo_con_mismo_mtime_y_tamano_no_usa_el_indice_viejo(tmp_path):
+    ruta = str(tmp_path / 'productos.txt')
+    _escribir(ruta, [f'{i:04d}\n' for i in range(2 * PASO)])
+    visor = VisorArchivos()
+    viejo = visor.info(ruta)
+
+    # otra exportación del mismo tamaño, con líneas de otro largo, publicada con rename
+    nuevo = str(tmp_path / 'nuevo.txt')
+    _escribir(nuevo, [f'{i:09d}\n' for i in range(2 * PASO * 5 // 10)])
+    assert os.path.getsize(nuevo) == viejo.tamano
+    os.utime(nuevo, ns=(viejo.mtime_ns, viejo.mtime_ns))
+    os.replace(nuevo, ruta)
+
+    assert visor.info(ruta).total_lineas == PASO
+    assert list(visor.lineas(ruta, PASO - 2, 5)) == [f'{i:09d}\n'.encode() for i in (PASO - 2, PASO - 1)]
+
+
+def test_pagina_empezada_sigue_en_el_archivo_que_abrio(tmp_path):
+    ruta = str(tmp_path / 'productos.txt')
+    _escribir(ruta, [f'viejo {i}\n' for i in range(3 * PASO)])
+    visor = VisorArchivos()
+    pagina = visor.lineas(ruta, PASO + 5, 3)
+    primera = next(pagina)
+    nuevo = str(tmp_path / 'nuevo.txt')
+    _escribir(nuevo, [f'nuevo {i}\n' for i in range(10)])
+    os.replace(nuevo, ruta)
+    assert [primera, *pagina] == [f'viejo {i}\n'.encode() for i in range(PASO + 5, PASO + 8)]
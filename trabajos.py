@@ -0,0 +1,290 @@
+# Trabajos en segundo plano (exportaciones, importaciones) sin broker externo.
+# La cola es la tabla 'trabajos' de la BD de la app: cada worker de gunicorn corre unos
+# hilos que toman el trabajo pendiente más viejo con un UPDATE condicional (si dos lo
+# intentan a la vez, uno solo cambia la fila). El progreso y los pedidos de cancelación
+# pasan por la misma fila, así cualquier worker puede responder /trabajos/<id>.
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from modelos import db, Trabajo
+from persistencia import INSTANCE_FOLDER, TAMANO_BLOQUE
+
+log = logging.getLogger(__name__)
+
+TRABAJOS_DIR = os.path.join(INSTANCE_FOLDER, 'trabajos')  # archivos de resultado
+ACTIVOS = ('pendiente', 'en_curso')
+# tipo -> función(progreso, **parametros) -> dict con el resultado; si el dict trae
+# 'archivo', es un nombre dentro de TRABAJOS_DIR que se borra al vencer la retención
+TAREAS = {}
+
+
+def tarea(tipo):
+    """Registra la función que ejecuta los trabajos de 'tipo'."""
+    def registrar(funcion):
+        TAREAS[tipo] = funcion
+        return funcion
+    return registrar
+
+
+class Cancelado(Exception):
+    """Se pidió cancelar el trabajo mientras corría."""
+
+
+class Progreso:
+    """
+    Lo recibe cada tarea. avanzar() acumula y escribe en la fila del trabajo a lo sumo
+    cada 'intervalo' segundos; al escribir también lee si se pidió cancelar.
+    Usa su propia conexión: la sesión de la tarea puede tener un cursor abierto.
+    """
+    def __init__(self, trabajo_id, intervalo=0.5):
+        self.trabajo_id = trabajo_id
+        self.intervalo = intervalo
+        self.hechos = 0
+        self._total = None
+        self._ultimo = 0.0
+
+    def total(self, n):
+        self._total = n
+        self._reportar()
+
+    def avanzar(self, n=1):
+        self.hechos += n
+        if time.monotonic() - self._ultimo >= self.intervalo:
+            self._reportar()
+
+    def iterar(self, filas, cada=TAMANO_BLOQUE):
+        # cuenta las filas que pasan; el progreso se revisa una vez por bloque
+        n = 0
+        for fila in filas:
+            yield fila
+            n += 1
+            if n == cada:
+                self.avanzar(n)
+                n = 0
+        self.avanzar(n)
+
+    def _reportar(self):
+        self._ultimo = time.monotonic()
+        with db.engine.begin() as conn:
+            conn.execute(update(Trabajo).where(Trabajo.id == self.trabajo_id)
+                         .values(progreso=self.hechos, total=self._total, latido=datetime.utcnow()))
+            cancelar = conn.scalar(select(Trabajo.cancelar).where(Trabajo.id == self.trabajo_id))
+        if cancelar:
+            raise Cancelado()
+
+
+# --- API ---
+
+def encolar(tipo, clave=None, **parametros):
+    """
+    Crea un trabajo pendiente y devuelve su id. Si ya hay uno pendiente o en curso con la
+    misma clave (por defecto: tipo y parámetros) devuelve el id de ese.
+    """
+    if tipo not in TAREAS:
+        raise ValueError(f'Tipo de trabajo desconocido: {tipo}')
+    texto = json.dumps(parametros, sort_keys=True)
+    clave = clave or f'{tipo}:{texto}'
+    existente = db.session.scalar(select(Trabajo.id).where(Trabajo.clave_activa == clave))
+    if existente is not None:
+        return existente
+    try:
+        trabajo_id = db.session.execute(
+            insert(Trabajo).values(tipo=tipo, parametros=texto, clave=clave, clave_activa=clave)
+        ).inserted_primary_key[0]
+        db.session.commit()
+    except IntegrityError:
+        # otro worker lo encoló en el medio
+        db.session.rollback()
+        existente = db.session.scalar(select(Trabajo.id).where(Trabajo.clave_activa == clave))
+        if existente is None:
+            raise
+        return existente
+    return trabajo_id
+
+
+def _dict(t):
+    return {
+        'id': t.id, 'tipo': t.tipo, 'parametros': json.loads(t.parametros), 'estado': t.estado,
+        'progreso': t.progreso, 'total': t.total, 'cancelar': t.cancelar,
+        'resultado': json.loads(t.resultado) if t.resultado else None, 'error': t.error,
+        'creado': t.creado.isoformat(),
+        'iniciado': t.iniciado.isoformat() if t.iniciado else None,
+        'terminado': t.terminado.isoformat() if t.terminado else None,
+    }
+
+
+def estado(trabajo_id):
+    t = db.session.get(Trabajo, trabajo_id, populate_existing=True)
+    return _dict(t) if t is not None else None
+
+
+def listar(limite=20, activos=False):
+    consulta = select(Trabajo).order_by(Trabajo.id.desc()).limit(limite)
+    if activos:
+        consulta = consulta.where(Trabajo.estado.in_(ACTIVOS))
+    return [_dict(t) for t in db.session.scalars(consulta.execution_options(populate_existing=True))]
+
+
+def cancelar(trabajo_id):
+    """Un pendiente se cancela al momento; uno en curso, en su próximo reporte de progreso."""
+    r = db.session.execute(
+        update(Trabajo).where(Trabajo.id == trabajo_id, Trabajo.estado == 'pendiente')
+        .values(estado='cancelado', clave_activa=None, terminado=datetime.utcnow())
+    )
+    if r.rowcount == 0:
+        r = db.session.execute(update(Trabajo).where(Trabajo.id == trabajo_id, Trabajo.estado == 'en_curso')
+                               .values(cancelar=True))
+    db.session.commit()
+    return r.rowcount > 0
+
+
+def archivo_resultado(nombre):
+    """Ruta de un resultado en TRABAJOS_DIR (crea la carpeta)."""
+    os.makedirs(TRABAJOS_DIR, exist_ok=True)
+    return os.path.join(TRABAJOS_DIR, nombre)
+
+
+# --- Ejecución ---
+
+class Ejecutor:
+    """
+    Hilos que corren los trabajos de la cola en este proceso.
+    - intervalo: segundos entre consultas a la cola cuando está vacía
+      (encolar desde este mismo proceso despierta a los hilos al momento).
+    - vencimiento: un trabajo en curso sin latido por más de estos segundos se da por
+      perdido (su worker murió) y vuelve a la cola.
+    - retencion: días que se guardan los trabajos terminados y sus archivos.
+    """
+    def __init__(self, app, hilos=1, intervalo=1.0, vencimiento=300, retencion=7):
+        self.app = app
+        self.hilos = hilos
+        self.intervalo = intervalo
+        self.vencimiento = vencimiento
+        self.retencion = retencion
+        self._hay_trabajo = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._en_curso = set()  # ids que corren en este proceso (para el latido)
+        self._ultima_purga = 0.0
+        self._ultimo_rescate = 0.0
+
+    def iniciar(self):
+        # una vez por proceso: los hilos del master no pasan al hijo después del fork
+        with self._lock:
+            if self.hilos <= 0 or self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            for i in range(self.hilos):
+                threading.Thread(target=self._bucle, name=f'trabajos-{i}', daemon=True).start()
+            threading.Thread(target=self._latir, name='trabajos-latido', daemon=True).start()
+
+    def despertar(self):
+        self._hay_trabajo.set()
+
+    def _bucle(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    if self.correr_uno():
+                        continue
+                    if time.monotonic() - self._ultima_purga > 3600:
+                        self._ultima_purga = time.monotonic()
+                        self.purgar()
+            except Exception:
+                log.exception("Error en el ejecutor de trabajos; se reintenta.")
+            self._hay_trabajo.wait(self.intervalo)
+            self._hay_trabajo.clear()
+
+    def _latir(self):
+        while True:
+            time.sleep(max(1.0, self.vencimiento / 3))
+            if not self._en_curso:
+                continue
+            try:
+                with self.app.app_context(), db.engine.begin() as conn:
+                    conn.execute(update(Trabajo).where(Trabajo.id.in_(list(self._en_curso)))
+                                 .values(latido=datetime.utcnow()))
+            except Exception:
+                log.exception("No se pudo registrar el latido de los trabajos.")
+
+    def _rescatar(self, ahora):
+        # trabajos de un worker que murió a mitad de camino; se busca primero con un SELECT
+        # para no tomar el candado de escritura (SQLite) cuando no hay ninguno
+        vencido = (Trabajo.estado == 'en_curso') & (Trabajo.latido < ahora - timedelta(seconds=self.vencimiento))
+        if db.session.scalar(select(Trabajo.id).where(vencido).limit(1)) is None:
+            return
+        db.session.execute(update(Trabajo).where(vencido).values(estado='pendiente', worker=None))
+        db.session.commit()
+
+    def _tomar(self):
+        # con la cola vacía solo se hacen lecturas
+        ahora = datetime.utcnow()
+        if time.monotonic() - self._ultimo_rescate >= self.vencimiento / 3:
+            self._ultimo_rescate = time.monotonic()
+            self._rescatar(ahora)
+        for trabajo_id in db.session.scalars(
+            select(Trabajo.id).where(Trabajo.estado == 'pendiente').order_by(Trabajo.id).limit(5)
+        ).all():
+            r = db.session.execute(
+                update(Trabajo).where(Trabajo.id == trabajo_id, Trabajo.estado == 'pendiente')
+                .values(estado='en_curso', worker=f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}',
+                        iniciado=ahora, latido=ahora)
+            )
+            db.session.commit()
+            if r.rowcount == 1:
+                return db.session.get(Trabajo, trabajo_id, populate_existing=True)
+        return None
+
+    def correr_uno(self):
+        """Toma y corre un trabajo pendiente. Devuelve False si la cola estaba vacía."""
+        trabajo = self._tomar()
+        if trabajo is None:
+            return False
+        trabajo_id, tipo, parametros = trabajo.id, trabajo.tipo, json.loads(trabajo.parametros)
+        self._en_curso.add(trabajo_id)
+        progreso = Progreso(trabajo_id)
+        valores = {}
+        inicio = time.monotonic()
+        try:
+            if tipo not in TAREAS:
+                raise ValueError(f'Tipo de trabajo desconocido: {tipo}')
+            resultado = TAREAS[tipo](progreso, **parametros)
+            valores = {'estado': 'terminado', 'resultado': json.dumps(resultado, default=str)}
+        except Cancelado:
+            valores = {'estado': 'cancelado'}
+        except Exception as e:
+            log.exception("Falló el trabajo %s (%s).", trabajo_id, tipo)
+            valores = {'estado': 'fallido', 'error': str(e)[:2000]}
+        finally:
+            self._en_curso.discard(trabajo_id)
+            db.session.rollback()  # lo que la tarea dejó sin confirmar
+            with db.engine.begin() as conn:
+                conn.execute(update(Trabajo).where(Trabajo.id == trabajo_id).values(
+                    clave_activa=None, progreso=progreso.hechos, terminado=datetime.utcnow(), **valores
+                ))
+        log.info("Trabajo %s (%s): %s en %.2fs", trabajo_id, tipo, valores.get('estado'), time.monotonic() - inicio)
+        return True
+
+    def purgar(self):
+        """Borra los trabajos terminados hace más de 'retencion' días y sus archivos."""
+        limite = datetime.utcnow() - timedelta(days=self.retencion)
+        viejos = db.session.execute(
+            select(Trabajo.id, Trabajo.resultado).where(Trabajo.estado.not_in(ACTIVOS), Trabajo.terminado < limite)
+        ).all()
+        for _, resultado in viejos:
+            nombre = (json.loads(resultado) or {}).get('archivo') if resultado else None
+            if nombre:
+                try:
+                    os.remove(os.path.join(TRABAJOS_DIR, os.path.basename(nombre)))
+                except FileNotFoundError:
+                    pass
+        for i in range(0, len(viejos), 500):
+            db.session.execute(delete(Trabajo).where(Trabajo.id.in_([v.id for v in viejos[i:i + 500]])))
+        db.session.commit()
+        return len(viejos)
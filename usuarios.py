@@ -0,0 +1,78 @@
+# Carga del usuario de la sesión (Flask-Login) con un cache TTL + LRU por id:
+# en estado estable una página autenticada no consulta la BD para saber quién es el usuario
+# (salvo una lectura de su versión cada 'verificar' segundos).
+import time
+import repositorio
+from cache_http import CacheLRU
+from conexion.models.user import Usuario
+
+
+class CacheUsuarios:
+    """
+    Guarda (id, nombre, email, rol, version) por id durante 'ttl' segundos; el hash de la
+    contraseña no se guarda. Los cambios de rol o contraseña hechos con este objeto
+    invalidan la entrada al momento; los hechos en otro worker o proceso suben la versión
+    del usuario en la BD, que se compara con la cacheada cada 'verificar' segundos.
+    """
+    def __init__(self, ttl=60.0, max_entradas=10000, verificar=2.0):
+        self.ttl = ttl
+        self.verificar = verificar
+        self._cache = CacheLRU(max_entradas)
+        self.vencidos = 0
+
+    def obtener(self, usuario_id):
+        entrada = self._cache.obtener(usuario_id)
+        if entrada is not None:
+            vence, revisar, fila = entrada
+            ahora = time.monotonic()
+            if ahora < vence:
+                if ahora < revisar:
+                    return _usuario(fila)
+                # una sola columna por clave primaria; si cambió se relee el usuario
+                if fila[4] is not None and repositorio.version_usuario(usuario_id) == fila[4]:
+                    self._cache.guardar(usuario_id, (vence, ahora + self.verificar, fila))
+                    return _usuario(fila)
+            self._cache.descartar(usuario_id)
+            self.vencidos += 1
+        fila = repositorio.usuario_por_id(usuario_id)
+        if fila is None:
+            return None
+        self._guardar(tuple(fila))
+        return _usuario(fila)
+
+    def guardar(self, usuario):
+        # después del login: la primera página ya no necesita ir a la BD. La versión no se
+        # conoce: en la primera verificación se relee el usuario completo
+        self._guardar((usuario.id, usuario.nombre, usuario.email, usuario.rol, None))
+
+    def _guardar(self, fila):
+        ahora = time.monotonic()
+        self._cache.guardar(fila[0], (ahora + self.ttl, ahora + self.verificar, fila))
+
+    def invalidar(self, usuario_id):
+        self._cache.descartar(usuario_id)
+
+    def cambiar_rol(self, usuario_id, rol):
+        ok = repositorio.cambiar_rol(usuario_id, rol)
+        self.invalidar(usuario_id)
+        return ok
+
+    def cambiar_password(self, usuario_id, password_hash):
+        ok = repositorio.cambiar_password(usuario_id, password_hash)
+        self.invalidar(usuario_id)
+        return ok
+
+    def metricas(self):
+        aciertos = self._cache.aciertos - self.vencidos
+        fallos = self._cache.fallos + self.vencidos
+        return {
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'tasa_aciertos': round(aciertos / (aciertos + fallos), 4) if aciertos + fallos else 0.0,
+            'entradas': len(self._cache),
+        }
+
+
+def _usuario(fila):
+    id, nombre, email, rol, _ = fila
+    return Usuario(id, nombre, email, None, rol)
@@ -0,0 +1,72 @@
+# Lectura por páginas de archivos grandes (exportaciones) usando mmap.
+# Se guarda un índice disperso: el offset de cada PASO líneas, por archivo,
+# y se reconstruye solo si cambia el archivo (inodo, mtime o tamaño).
+import os
+import mmap
+import threading
+from array import array
+from collections import namedtuple
+
+PASO = 1000  # una entrada del índice cada PASO líneas
+
+InfoArchivo = namedtuple('InfoArchivo', 'mtime_ns tamano total_lineas')
+
+
+class VisorArchivos:
+    def __init__(self):
+        self._indices = {}  # ruta -> (clave, InfoArchivo, array de offsets)
+        self._lock = threading.Lock()
+
+    def info(self, ruta) -> InfoArchivo:
+        with open(ruta, 'rb') as f:  # FileNotFoundError si no existe
+            return self._indice(ruta, f)[0]
+
+    def _indice(self, ruta, f):
+        # fstat del archivo ya abierto: si la exportación se reemplaza (rename atómico)
+        # el índice y la lectura siguen siendo del mismo archivo. El inodo distingue
+        # un reemplazo con el mismo mtime y tamaño
+        st = os.fstat(f.fileno())
+        clave = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            guardado = self._indices.get(ruta)
+        if guardado and guardado[0] == clave:
+            return guardado[1:]
+        offsets = array('Q', [0])
+        lineas = 0
+        if st.st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = 0
+                while True:
+                    i = mm.find(b'\n', pos)
+                    if i == -1:
+                        break
+                    pos = i + 1
+                    lineas += 1
+                    if lineas % PASO == 0:
+                        offsets.append(pos)
+                if pos < st.st_size:
+                    lineas += 1  # última línea sin salto final
+        guardado = (clave, InfoArchivo(st.st_mtime_ns, st.st_size, lineas), offsets)
+        with self._lock:
+            self._indices[ruta] = guardado
+        return guardado[1:]
+
+    def lineas(self, ruta, inicio, cantidad):
+        """Genera (en bytes) las líneas [inicio, inicio + cantidad) sin leer el resto del archivo."""
+        with open(ruta, 'rb') as f:
+            info, offsets = self._indice(ruta, f)
+            if not info.tamano or inicio >= info.total_lineas:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = offsets[inicio // PASO]
+                for _ in range(inicio % PASO):
+                    pos = mm.find(b'\n', pos) + 1
+                for _ in range(cantidad):
+                    if pos >= len(mm):
+                        return
+                    fin = mm.find(b'\n', pos)
+                    if fin == -1:
+                        yield mm[pos:]
+                        return
+                    yield mm[pos:fin + 1]
+                    pos = fin + 1